@@ -0,0 +1,162 @@
+import math
+
+
+class AutomorphismGroup(object):
+    """
+    The automorphism group of a curve.
+
+    An automorphism permutes the vertices and the half-edges of the curve, preserving genera, incidence and the number
+    of legs at each vertex. Half-edge ``(e, n)`` is the ``n``-th endpoint of edge ``e``, where ``n`` is 1 or 2. Besides
+    the permutations of vertices found by the
+    :class:`~Tropical2020.basic_families.CanonicalForm.CanonicalForm` of the curve, automorphisms may permute parallel
+    edges, permute the loops based at a vertex, flip a loop by exchanging its two half-edges, and permute the legs at a
+    vertex, which are not distinguished from one another.
+
+    The group is the product of the group of vertex permutations with the group fixing every vertex, so its order is the
+    order of the vertex permutation group times ``m!`` for each class of ``m`` parallel edges joining distinct vertices,
+    times ``m! * 2^m`` for each vertex with ``m`` loops, and times ``l!`` for each vertex with ``l`` legs. This is the
+    order used in orbifold Euler characteristics. The generators only describe the action on vertices and half-edges,
+    since permutations of legs do not act on the edges.
+
+    Attributes
+    ----------
+    order : int
+        the order of the group, including the permutations of legs
+    vertexOrder : int
+        the order of the group of permutations of the vertices induced by the group
+    generators : list
+        pairs ``(vertexMap, halfEdgeMap)`` of dictionaries, mapping each vertex and each half-edge to its image, which
+        generate the group
+    """
+
+    def __init__(self, canonicalForm, vertices: list, edges: list, endpoints: list, legCounts: list = None):
+        """
+        Parameters
+        ----------
+        canonicalForm : :class:`~Tropical2020.basic_families.CanonicalForm.CanonicalForm`
+            the canonical form of the curve
+        vertices : list
+            the vertices of the curve, where ``vertices[i]`` is vertex ``i`` of the canonical form
+        edges : list
+            the edges of the curve
+        endpoints : list
+            ``endpoints[k]`` is the pair of indices in ``vertices`` of the first and second endpoints of ``edges[k]``
+        legCounts : list, optional
+            ``legCounts[i]`` is the number of legs at ``vertices[i]``. If it is not given, then the curve has no legs.
+        """
+
+        self._vertices = vertices
+        self._edges = edges
+        self._endpoints = endpoints
+
+        # The edges joining each unordered pair of vertices, in a fixed order
+        self._classes = {}
+        for k, (a, b) in enumerate(endpoints):
+            self._classes.setdefault((a, b) if a <= b else (b, a), []).append(k)
+
+        self.vertexOrder = canonicalForm.groupOrder
+        self.order = self.getOrder(self.vertexOrder, endpoints, legCounts)
+
+        self.generators = [self._liftVertexPermutation(p) for p in canonicalForm.generators]
+        for (a, b), parallelEdges in self._classes.items():
+            m = len(parallelEdges)
+            identity = list(range(len(vertices)))
+
+            # A transposition and an m-cycle generate all permutations of the class
+            if m >= 2:
+                self.generators.append(self._toMaps(identity, {
+                    parallelEdges[0]: parallelEdges[1], parallelEdges[1]: parallelEdges[0]}))
+            if m >= 3:
+                self.generators.append(self._toMaps(identity, {
+                    parallelEdges[i]: parallelEdges[(i + 1) % m] for i in range(m)}))
+            if a == b:
+                self.generators.append(self._toMaps(identity, {}, flip=parallelEdges[0]))
+
+    @staticmethod
+    def getOrder(vertexOrder: int, endpoints, legCounts: list = None):
+        """
+        Returns the order of the automorphism group of a curve, without building its generators.
+
+        Parameters
+        ----------
+        vertexOrder : int
+            the order of the group of permutations of the vertices, as given by
+            :func:`~Tropical2020.basic_families.CanonicalForm.CanonicalForm.groupOrder`
+        endpoints : iterable
+            the pairs of indices of the first and second endpoints of the edges
+        legCounts : list, optional
+            the number of legs at each vertex. If it is not given, then the curve has no legs.
+        """
+
+        multiplicities = {}
+        for a, b in endpoints:
+            key = (a, b) if a <= b else (b, a)
+            multiplicities[key] = multiplicities.get(key, 0) + 1
+
+        order = vertexOrder
+        for (a, b), m in multiplicities.items():
+            order *= math.factorial(m)
+            if a == b:
+                order *= 2 ** m
+        for numLegs in legCounts or ():
+            order *= math.factorial(numLegs)
+        return order
+
+    # Returns the half-edge of edge k at vertex index v, choosing the endpoint with the same number as n for loops
+    def _halfEdgeAt(self, k: int, v: int, n: int):
+        a, b = self._endpoints[k]
+        if a == b:
+            return self._edges[k], n
+        return self._edges[k], 1 if a == v else 2
+
+    # Returns the automorphism acting on vertex indices by the permutation p, and mapping each edge k to
+    # edgeImages.get(k, k). If flip is given, then the half-edges of that loop are exchanged.
+    def _toMaps(self, p: list, edgeImages: dict, flip=None):
+        vertexMap = {self._vertices[v]: self._vertices[p[v]] for v in range(len(p))}
+        halfEdgeMap = {}
+        for k, (a, b) in enumerate(self._endpoints):
+            image = edgeImages.get(k, k)
+            for n, v in ((1, a), (2, b)):
+                imageN = 3 - n if k == flip else n
+                halfEdgeMap[(self._edges[k], n)] = self._halfEdgeAt(image, p[v], imageN)
+        return vertexMap, halfEdgeMap
+
+    # Extends a permutation of the vertices to an automorphism, mapping the i-th edge of each class of parallel edges
+    # to the i-th edge of the image class
+    def _liftVertexPermutation(self, p: list):
+        edgeImages = {}
+        for (a, b), parallelEdges in self._classes.items():
+            x, y = p[a], p[b]
+            for k, image in zip(parallelEdges, self._classes[(x, y) if x <= y else (y, x)]):
+                edgeImages[k] = image
+        return self._toMaps(p, edgeImages)
+
+    # Returns the sign of the permutation sending k to image[k]
+    @staticmethod
+    def permutationSign(image: list):
+        # A permutation is odd if and only if it has an odd number of cycles of even length
+        sign = 1
+        seen = [False] * len(image)
+        for start in range(len(image)):
+            if seen[start]:
+                continue
+            k, length = start, 0
+            while not seen[k]:
+                seen[k] = True
+                k = image[k]
+                length += 1
+            if length % 2 == 0:
+                sign = -sign
+        return sign
+
+    def reversesOrientation(self):
+        """
+        Returns whether some automorphism induces an odd permutation of the edges. Such a curve reverses the
+        orientations of its cell, given by orderings of its edges, so the cell vanishes in the cellular chain complex.
+        """
+
+        index = {e: k for k, e in enumerate(self._edges)}
+        for _, halfEdgeMap in self.generators:
+            if self.permutationSign([index[halfEdgeMap[(e, 1)][0]] for e in self._edges]) < 0:
+                return True
+        return False
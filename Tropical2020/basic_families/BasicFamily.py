@@ -1,4 +1,6 @@
 import numpy as np
+from .AutomorphismGroup import AutomorphismGroup
+from .CanonicalForm import CanonicalForm
 from .GraphIsoHelper import *
 from .RPC import *
 
@@ -35,34 +37,105 @@ class BasicFamily(object):
         self._legs = set()
         self.monoid = Monoid()
 
-        # Variables for caching vertices
-        self._vertexCacheValid = False
-        self._vertexCache = set()
+        # Incidence index, updated incrementally as vertices, edges, and legs are added, removed, or moved.
+        # _endpointsAt[v] is the set of pairs (e, n) such that the n^th endpoint of edge e is v,
+        # _legsAt[v] is the set of legs rooted at v, and _loopsAt[v] is the number of self loops based at v.
+        self._endpointsAt = {}
+        self._legsAt = {}
+        self._loopsAt = {}
 
-        # Variables for caching genus
-        self._genusCacheValid = False
-        self._genusCache = 0
+        # Running totals used to compute the genus
+        self._vertexGenusSum = 0
+        self._numEdgesWithVertices = 0
 
-        # Variables for caching vertex characteristic counts
-        self._vertexCharacteristicCacheValid = False
+        # Counts of vertex characteristics. _characteristicOf[v] is the characteristic of v as currently counted, and
+        # the vertices in _dirtyVertices need to be recounted before the counts are next used.
         self._vertexCharacteristicCache = {}
+        self._characteristicOf = {}
+        self._dirtyVertices = set()
 
         # Variables for caching the core
         self._coreCacheValid = False
         self._coreCache = None
 
+        # Variables for caching the canonical form
+        self._canonicalFormCacheValid = False
+        self._canonicalFormCache = None
+        self._canonicalVertexOrder = []
+        self._automorphismGroupCache = None
+
     def invalidateCaches(self):
         """
-        Invalidates the vertex, genus, characteristic, and core caches
+        Invalidates the core and canonical form caches
+
+        The incidence index, genus, and vertex characteristic counts are updated incrementally and are not affected.
         """
 
-        self._vertexCacheValid = False
-        self._genusCacheValid = False
-        self._vertexCharacteristicCacheValid = False
         self._coreCacheValid = False
+        self._canonicalFormCacheValid = False
+
+    # Marks the given vertices as needing their characteristics recounted
+    def _markDirty(self, vertices):
+        self._dirtyVertices.update(vertices)
+
+    # Recounts the characteristics of the vertices that changed since the counts were last used
+    def _recountDirtyVertices(self):
+        counts = self._vertexCharacteristicCache
+        for v in self._dirtyVertices:
+            oldKey = self._characteristicOf.pop(v, None)
+            if oldKey is not None:
+                if counts[oldKey] == 1:
+                    del counts[oldKey]
+                else:
+                    counts[oldKey] -= 1
+            if v in self._vertices:
+                key = self.getVertexCharacteristic(v)
+                self._characteristicOf[v] = key
+                counts[key] = counts.get(key, 0) + 1
+        self._dirtyVertices = set()
+
+    # Adds (sign = 1) or removes (sign = -1) edge e from the incidence index
+    def _indexEdge(self, e: Edge, sign: int):
+        for n, v in ((1, e.vert1), (2, e.vert2)):
+            if v is not None:
+                if sign > 0:
+                    self._endpointsAt.setdefault(v, set()).add((e, n))
+                else:
+                    self._endpointsAt[v].discard((e, n))
+
+        if e.vert1 is not None and e.vert2 is not None:
+            self._numEdgesWithVertices += sign
+            if e.vert1 == e.vert2:
+                self._loopsAt[e.vert1] = self._loopsAt.get(e.vert1, 0) + sign
+
+    # Adds (sign = 1) or removes (sign = -1) leg l from the incidence index
+    def _indexLeg(self, l: Leg, sign: int):
+        if l.root is not None:
+            if sign > 0:
+                self._legsAt.setdefault(l.root, set()).add(l)
+            else:
+                self._legsAt[l.root].discard(l)
+
+    # Rebuilds the incidence index, genus totals, and characteristic counts from scratch
+    def _rebuildIncidenceIndex(self):
+        self._endpointsAt = {}
+        self._legsAt = {}
+        self._loopsAt = {}
+        self._numEdgesWithVertices = 0
+        self._vertexGenusSum = sum(v.genus for v in self._vertices)
+        self._vertexCharacteristicCache = {}
+        self._characteristicOf = {}
+        self._dirtyVertices = set(self._vertices)
+
+        for e in self._edges:
+            self._indexEdge(e, 1)
+        for nextLeg in self._legs:
+            self._indexLeg(nextLeg, 1)
+
+        self.invalidateCaches()
 
-    # The set of vertices is a read only property computed upon access, unless a valid cache is available
-    # It is the collection of vertices that are endpoints of edges or roots of legs
+    # The set of vertices is a read only property
+    # It contains the endpoints of edges, roots of legs, and any vertices added directly
     @property
     def vertices(self):
         return self._vertices
@@ -76,10 +149,12 @@ class BasicFamily(object):
         v : :class:`~Tropical2020.basic_families.Vertex.Vertex`
             the vertex to be added
         """
-        if v is not None:
+        if v is not None and v not in self._vertices:
             self._vertices.add(v)
+            self._vertexGenusSum += v.genus
+            self._dirtyVertices.add(v)
 
-            # Possibly need to recalculate genus/core/etc.
+            # Possibly need to recalculate core/etc.
             self.invalidateCaches()
 
     def addVertices(self, vertices: set):
@@ -115,15 +190,22 @@ class BasicFamily(object):
         """
 
         if v in self._vertices:
+            self._dirtyVertices.add(v)
             self._vertices.remove(v)
+            self._vertexGenusSum -= v.genus
 
             # Removing a vertex removes all connected legs and edges
-            for e in {e for e in self.edges if v in e.vertices}:
+            for e in {e for (e, n) in self._endpointsAt.get(v, ())}:
                 self.removeEdge(e, removeDanglingVertices)
-            for nextLeg in {nextLeg for nextLeg in self.legs if v in nextLeg.vertices}:
+            for nextLeg in set(self._legsAt.get(v, ())):
                 self.removeLeg(nextLeg)
 
-            # Possibly need to recalculate genus/core/etc.
+            # The vertex is isolated, so forget it in the incidence index
+            self._endpointsAt.pop(v, None)
+            self._legsAt.pop(v, None)
+            self._loopsAt.pop(v, None)
+
+            # Possibly need to recalculate core/etc.
             self.invalidateCaches()
 
     def removeVertices(self, vertices: set):
@@ -158,14 +240,18 @@ class BasicFamily(object):
     @edges.setter
     def edges(self, edges_: set):
         self._edges = edges_
-        self.invalidateCaches()
+        self._rebuildIncidenceIndex()
 
     def addEdge(self, e: Edge):
-        self._edges.add(e)
         self.addVertices(e.vertices)
 
-        # Possibly need to recalculate genus/core/etc.
-        self.invalidateCaches()
+        if e not in self._edges:
+            self._edges.add(e)
+            self._indexEdge(e, 1)
+            self._markDirty(e.vertices)
+
+            # Possibly need to recalculate core/etc.
+            self.invalidateCaches()
 
     def addEdges(self, edges: set):
         for e in copy.copy(edges):
@@ -174,6 +260,8 @@ class BasicFamily(object):
     def removeEdge(self, e: Edge, removeDanglingVertices: bool = True):
         if e in self._edges:
             self._edges.remove(e)
+            self._indexEdge(e, -1)
+            self._markDirty(e.vertices)
 
             # A "dangling vertex" is an endpoint of e is isolated after we remove edge e
             # By default, removing an edge removes such vertices
@@ -182,7 +270,7 @@ class BasicFamily(object):
                     if self.degree(v) == 0:
                         self.removeVertex(v)
 
-            # Possibly need to recalculate genus/core/etc.
+            # Possibly need to recalculate core/etc.
             self.invalidateCaches()
 
     def removeEdges(self, edges: set):
@@ -202,16 +290,18 @@ class BasicFamily(object):
     @legs.setter
     def legs(self, legs_: set):
         self._legs = legs_
-
-        # Possibly need to recalculate genus/core/etc.
-        self.invalidateCaches()
+        self._rebuildIncidenceIndex()
 
     def addLeg(self, newLeg: Leg):
-        self._legs.add(newLeg)
         self.addVertices(newLeg.vertices)
 
-        # Possibly need to recalculate genus/core/etc.
-        self.invalidateCaches()
+        if newLeg not in self._legs:
+            self._legs.add(newLeg)
+            self._indexLeg(newLeg, 1)
+            self._markDirty(newLeg.vertices)
+
+            # Possibly need to recalculate core/etc.
+            self.invalidateCaches()
 
     def addLegs(self, newLegs: set):
         for newLeg in copy.copy(newLegs):
@@ -220,6 +310,8 @@ class BasicFamily(object):
     def removeLeg(self, badLeg: Leg, removeDanglingVertices: bool = True):
         if badLeg in self._legs:
             self._legs.remove(badLeg)
+            self._indexLeg(badLeg, -1)
+            self._markDirty(badLeg.vertices)
 
             # The root of a leg is "dangling" if it becomes isolated after removing the leg
             # By default, removing a leg removes such a vertex
@@ -228,13 +320,62 @@ class BasicFamily(object):
                     if self.degree(v) == 0:
                         self.removeVertex(v)
 
-            # Possibly need to recalculate genus/core/etc.
+            # Possibly need to recalculate core/etc.
             self.invalidateCaches()
 
     def removeLegs(self, badLegs: set):
         for badLeg in copy.copy(badLegs):
             self.removeLeg(badLeg)
 
+    def moveEndpoint(self, x, n: int, v: Vertex):
+        """
+        Moves an endpoint of an edge or leg to another vertex.
+
+        Endpoints of edges and legs of the family should be moved with this function rather than by setting
+        ``vert1``, ``vert2``, or ``root`` directly, so that the incidence index stays up to date.
+
+        Parameters
+        ----------
+        x : :class:`~Tropical2020.basic_families.Edge.Edge` or :class:`~Tropical2020.basic_families.Leg.Leg`
+            the edge or leg whose endpoint is moved
+        n : int
+            which endpoint of ``x`` to move (1 or 2 for an edge, 1 for the root of a leg), as in
+            :func:`~getEndpointsOfEdges`
+        v : :class:`~Tropical2020.basic_families.Vertex.Vertex`
+            the new endpoint, which is added to the family if necessary
+        """
+
+        isEdge = isinstance(x, Edge)
+        if isEdge:
+            oldVertex = x.vert1 if n == 1 else x.vert2
+            tracked = x in self._edges
+        else:
+            oldVertex = x.root
+            tracked = x in self._legs
+
+        if tracked:
+            self._markDirty((oldVertex, v))
+            if isEdge:
+                self._indexEdge(x, -1)
+            else:
+                self._indexLeg(x, -1)
+
+        if not isEdge:
+            x.root = v
+        elif n == 1:
+            x.vert1 = v
+        else:
+            x.vert2 = v
+
+        if tracked:
+            if isEdge:
+                self._indexEdge(x, 1)
+            else:
+                self._indexLeg(x, 1)
+            self.invalidateCaches()
+
+        self.addVertex(v)
+
     @property
     def numVertices(self):
         return len(self.vertices)
@@ -249,7 +390,7 @@ class BasicFamily(object):
 
     @property
     def numEdgesWithVertices(self):
-        return len(self.edgesWithVertices)
+        return self._numEdgesWithVertices
 
     # The Betti number is a read only property computed upon access
     @property
@@ -258,11 +399,7 @@ class BasicFamily(object):
 
     @property
     def genus(self):
-        # If the cached copy of genus is invalid, then recalculate it
-        if not self._genusCacheValid:
-            self._genusCache = self.bettiNumber + sum([v.genus for v in self.vertices])
-            self._genusCacheValid = True
-        return self._genusCache
+        return self.bettiNumber + self._vertexGenusSum
 
     # Returns the degree of vertex v accounting for legs and self loops
     def degree(self, v: Vertex):
@@ -270,11 +407,11 @@ class BasicFamily(object):
 
     # Returns the number of endpoints of finite edges at vertex v
     def edgeDegree(self, v: Vertex):
-        return sum(1 for e in self.edges if e.vert1 == v) + sum(1 for e in self.edges if e.vert2 == v)
+        return len(self._endpointsAt.get(v, ()))
 
     # Returns the number of roots of legs at v
     def legDegree(self, v: Vertex):
-        return sum(1 for attachedLeg in self.legs if attachedLeg.root == v)
+        return len(self._legsAt.get(v, ()))
 
     # Returns a copy of this curve where all vertices, edges, and legs are also copied shallowly
     def getFullyShallowCopy(self, returnCopyInfo: bool = False):
@@ -293,29 +430,41 @@ class BasicFamily(object):
                 copyInfo[v] = vCopy
 
         # Next, copy edges and legs
-        edgeCopies = set()
+        edgeCopyDict = {}
         for nextEdge in self.edges:
             # Keep the same name and length, but use the new versions of endpoints
             nextEdgeCopy = Edge(nextEdge.name, nextEdge.length,
-                                vertexCopyDict[nextEdge.vert1], vertexCopyDict[nextEdge.vert2])
-            edgeCopies.add(nextEdgeCopy)
+                                vertexCopyDict.get(nextEdge.vert1), vertexCopyDict.get(nextEdge.vert2))
+            edgeCopyDict[nextEdge] = nextEdgeCopy
 
             if returnCopyInfo:
                 copyInfo[nextEdge] = nextEdgeCopy
 
-        legCopies = set()
+        legCopyDict = {}
         for nextLeg in self.legs:
             # Keep the sane name, but use the new version of the root
-            nextLegCopy = Leg(nextLeg.name, vertexCopyDict[nextLeg.root])
-            legCopies.add(nextLegCopy)
+            nextLegCopy = Leg(nextLeg.name, vertexCopyDict.get(nextLeg.root))
+            legCopyDict[nextLeg] = nextLegCopy
 
             if returnCopyInfo:
                 copyInfo[nextLeg] = nextLegCopy
 
-        # Build the copy
+        # Build the copy. Rather than adding the copied pieces one at a time, translate our incidence index and
+        # characteristic counts along the copy.
+        counts = self.vertexCharacteristicCounts
         curveCopy = BasicFamily(self.name)
-        curveCopy.addEdges(edgeCopies)
-        curveCopy.addLegs(legCopies)
+        curveCopy._vertices = set(vertexCopyDict.values())
+        curveCopy._edges = set(edgeCopyDict.values())
+        curveCopy._legs = set(legCopyDict.values())
+        curveCopy._endpointsAt = {vertexCopyDict[v]: {(edgeCopyDict[e], n) for (e, n) in self._endpointsAt[v]}
+                                  for v in self._endpointsAt if v in vertexCopyDict}
+        curveCopy._legsAt = {vertexCopyDict[v]: {legCopyDict[l] for l in self._legsAt[v]}
+                             for v in self._legsAt if v in vertexCopyDict}
+        curveCopy._loopsAt = {vertexCopyDict[v]: self._loopsAt[v] for v in self._loopsAt if v in vertexCopyDict}
+        curveCopy._vertexGenusSum = self._vertexGenusSum
+        curveCopy._numEdgesWithVertices = self._numEdgesWithVertices
+        curveCopy._vertexCharacteristicCache = dict(counts)
+        curveCopy._characteristicOf = {vertexCopyDict[v]: key for v, key in self._characteristicOf.items()}
         curveCopy.monoid = copy.copy(self.monoid)
 
         if returnCopyInfo:
@@ -339,14 +488,9 @@ class BasicFamily(object):
         v = Vertex("(Contraction of " + e.name + ")", genus)
 
         # For each edge or leg adjacent to e, move endpoints to the contraction of e
-        for nextEdge in copy.copy(self.edges) - {e}:
-            if nextEdge.vert1 in e.vertices:
-                nextEdge.vert1 = v
-            if nextEdge.vert2 in e.vertices:
-                nextEdge.vert2 = v
-        for nextLeg in self.legs:
-            if nextLeg.root in e.vertices:
-                nextLeg.root = v
+        for (x, n) in {p for u in e.vertices for p in self.getEndpointsOfEdges(u)}:
+            if x is not e:
+                self.moveEndpoint(x, n, v)
 
         # Apply the contraction
         self.addVertex(v)
@@ -370,47 +514,36 @@ class BasicFamily(object):
     # and the n^th endpoint of e is v
     def getEndpointsOfEdges(self, v: Vertex):
 
-        endpoints = []
-
-        for e in self.edges:
-            if e.vert1 == v:
-                endpoints += [(e, 1)]
-            if e.vert2 == v:
-                endpoints += [(e, 2)]
+        endpoints = set(self._endpointsAt.get(v, ()))
 
         # By default, consider the root of a leg to be its first endpoint
-        for nextLeg in self.legs:
-            if nextLeg.root == v:
-                endpoints += [(nextLeg, 1)]
+        for nextLeg in self._legsAt.get(v, ()):
+            endpoints.add((nextLeg, 1))
+
+        return endpoints
+
+    # Returns the neighbors of v other than v itself, listed with multiplicity
+    def getNeighbors(self, v: Vertex):
+        neighbors = []
+        for (e, n) in self._endpointsAt.get(v, ()):
+            u = e.vert2 if n == 1 else e.vert1
+            if u != v:
+                neighbors.append(u)
+        return neighbors
 
-        return set(endpoints)
+    # Returns the characteristic of vertex v, which is (d_e, d_l, g, l), where d_e is the edge degree of v,
+    # d_l is the leg degree of v, g is the genus of v, and there are l loops based at v.
+    def getVertexCharacteristic(self, v: Vertex):
+        return self.edgeDegree(v), self.legDegree(v), v.genus, self._loopsAt.get(v, 0)
 
     # This dictionary keeps track of the number of vertices of a certain characteristic
-    # Currently, the characteristic of a vertex v is (d_e, d_l, g, l), where d_e is the edge degree of v,
-    # d_l is the leg degree of v, and g is the genus of v, and there are l loops based at v.
     # The characteristic of a vertex is invariant under isomorphism, so if two graphs have different
     # "vertexEverythingDict"s, then they are definitely not isomorphic.
+    # The counts are updated incrementally as the curve changes.
     @property
     def vertexCharacteristicCounts(self):
-        # If the cached copy of the dictionary is invalid, then recalculate it.
-        if not self._vertexCharacteristicCacheValid:
-            self._vertexCharacteristicCache = {}
-            for v in self.vertices:
-                # Calculate the characteristic of v
-                edgeDegree = self.edgeDegree(v)
-                legDegree = self.legDegree(v)
-                g = v.genus
-                loops = sum(1 for e in self.edges if e.vertices == {v})
-                key = (edgeDegree, legDegree, g, loops)
-
-                # Increase the count of that characteristic, or set it to 1 if not already seen
-                if key in self._vertexCharacteristicCache:
-                    self._vertexCharacteristicCache[key] += 1
-                else:
-                    self._vertexCharacteristicCache[key] = 1
-
-            self._vertexCharacteristicCacheValid = True
-
+        if self._dirtyVertices:
+            self._recountDirtyVertices()
         return self._vertexCharacteristicCache
 
     # Very similar to the vertexCharacteristicCounts. Returns a dictionary vertexDict defined as follows. The keys of
@@ -424,11 +557,7 @@ class BasicFamily(object):
         vertexDict = {}
         for v in self.vertices:
             # Get the characteristic of v
-            edgeDegree = self.edgeDegree(v)
-            legDegree = self.legDegree(v)
-            g = v.genus
-            loops = sum(1 for e in self.edges if e.vertices == {v})
-            key = (edgeDegree, legDegree, g, loops)
+            key = self.getVertexCharacteristic(v)
 
             # Update that characteristic entry, or initialize it if not already present
             if key in vertexDict:
@@ -437,9 +566,73 @@ class BasicFamily(object):
                 vertexDict[key] = [v]
         return vertexDict
 
+    # The canonical form of the underlying vertex-colored multigraph, where the color of a vertex is its
+    # characteristic. Vertex i of the canonical form is canonicalVertexOrder[i].
+    @property
+    def canonicalForm(self):
+        """
+        The :class:`~Tropical2020.basic_families.CanonicalForm.CanonicalForm` of the curve.
+
+        The vertices of the curve are colored by their characteristics and the edges between distinct vertices are
+        recorded with multiplicity. Loops and legs are accounted for by the characteristics.
+        """
+
+        # If the cached canonical form is invalid, then recalculate it.
+        if not self._canonicalFormCacheValid:
+            self._canonicalVertexOrder = list(self.vertices)
+            index = {v: i for i, v in enumerate(self._canonicalVertexOrder)}
+
+            colors = [self.getVertexCharacteristic(v) for v in self._canonicalVertexOrder]
+            adjacency = [{} for _ in self._canonicalVertexOrder]
+            for e in self.edgesWithVertices:
+                if e.vert1 != e.vert2:
+                    i, j = index[e.vert1], index[e.vert2]
+                    adjacency[i][j] = adjacency[i].get(j, 0) + 1
+                    adjacency[j][i] = adjacency[j].get(i, 0) + 1
+
+            self._canonicalFormCache = CanonicalForm(colors, adjacency)
+            self._canonicalFormCacheValid = True
+            self._automorphismGroupCache = None
+
+        return self._canonicalFormCache
+
+    @property
+    def canonicalCertificate(self):
+        """
+        A certificate of the isomorphism class of the curve: two curves are isomorphic if and only if their
+        certificates are equal.
+        """
+
+        return self.canonicalForm.certificate
+
+    @property
+    def canonicalVertexOrder(self):
+        """
+        The list of vertices of the curve in canonical order.
+        """
+
+        labeling = self.canonicalForm.labeling
+        return [self._canonicalVertexOrder[i] for i in labeling]
+
+    def automorphismGroup(self):
+        """
+        Returns the :class:`~Tropical2020.basic_families.AutomorphismGroup.AutomorphismGroup` of the curve, whose
+        automorphisms act on the vertices of the curve and on the half-edges ``(e, n)``. It is cached along with the
+        canonical form.
+        """
+
+        canonicalForm = self.canonicalForm
+        if self._automorphismGroupCache is None:
+            index = {v: i for i, v in enumerate(self._canonicalVertexOrder)}
+            edges = list(self.edgesWithVertices)
+            self._automorphismGroupCache = AutomorphismGroup(
+                canonicalForm, self._canonicalVertexOrder, edges, [(index[e.vert1], index[e.vert2]) for e in edges],
+                [len(self._legsAt.get(v, ())) for v in self._canonicalVertexOrder])
+        return self._automorphismGroupCache
+
     # Returns the number of edges whose endpoints are indistinct. Invariant under isomorphism
     def getNumSelfLoops(self):
-        return sum(1 for e in self.edges if len(e.vertices) == 1)
+        return sum(self._loopsAt.get(v, 0) for v in self.vertices)
 
     # Returns a list of all permutations of lst. A permutation of lst is itself a list.
     def getPermutations(self, lst: list):
@@ -469,7 +662,7 @@ class BasicFamily(object):
     def isBruteForceIsomorphicTo(self, other):
         return GraphIsoHelper.isBruteForceIsomorphicTo(self, other)
 
-    # Checks if some easy to check invariants are preserved, and then checks candidate bijections
+    # Checks if some easy to check invariants are preserved, and then compares canonical certificates
     def isIsomorphicTo(self, other):
         return GraphIsoHelper.isIsomorphicTo(self, other)
 
@@ -738,7 +931,7 @@ class BasicFamily(object):
 
             nextVertex = verticesToCheck.pop()
 
-            connectedEdges = {e for e in self.edges if (nextVertex == e.vert1 or nextVertex == e.vert2)}
+            connectedEdges = {e for (e, n) in self._endpointsAt.get(nextVertex, ())}
 
             adjacentVertices = set()
 
@@ -750,7 +943,7 @@ class BasicFamily(object):
             nextTree = tree.findVertex(nextVertex)
 
             for v in newAdjacentVertices:
-                connectingEdge = {e for e in self.edges if e.vertices == {nextVertex, v}}.pop()
+                connectingEdge = {e for e in connectedEdges if e.vertices == {nextVertex, v}}.pop()
                 nextTree.addChild(v, connectingEdge)
 
             verticesToCheck = verticesToCheck | newAdjacentVertices
@@ -858,7 +1051,7 @@ class BasicFamilyMorphism(object):
         elif isinstance(x, Leg):
             assert x in self.domain.legs, "The given input must be a domain leg."
             return self.curveMorphismDict[x]
-        elif isinstance(x, self.domain.monoid.Element):
+        elif isinstance(x, MonoidElement):
             return self.monoidMorphism(x)
         else:
             raise ValueError("Cannot call on the given input - not a reasonable type.")
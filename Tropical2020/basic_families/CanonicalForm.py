@@ -0,0 +1,296 @@
+class CanonicalForm(object):
+    """
+    Canonical labeling of a vertex-colored undirected multigraph.
+
+    The labeling is found by color refinement followed by an individualization-refinement search of the kind used by
+    nauty. Automorphisms found during the search are used to prune branches of the search tree that are images of
+    branches that have already been explored.
+
+    Two graphs are isomorphic (by an isomorphism preserving vertex colors and edge multiplicities) if and only if their
+    certificates are equal.
+
+    Attributes
+    ----------
+    certificate : tuple
+        a pair ``(colors, edges)``, where ``colors`` lists the vertex colors in canonical order and ``edges`` is the
+        sorted tuple of triples ``(i, j, m)``, meaning that there are ``m`` edges between the ``i``-th and ``j``-th
+        canonical vertices, where ``i < j``
+    labeling : list
+        ``labeling[i]`` is the index of the vertex placed at canonical position ``i``
+    generators : list
+        vertex permutations (as lists, ``p[v]`` being the image of ``v``) that generate the automorphism group
+    """
+
+    def __init__(self, colors: list, adjacency: list):
+        """
+        Parameters
+        ----------
+        colors : list
+            ``colors[v]`` is a sortable, hashable color of vertex ``v``
+        adjacency : list
+            ``adjacency[v]`` is a dictionary mapping each neighbor ``u != v`` of ``v`` to the number of edges between
+            ``u`` and ``v``. It should be symmetric.
+        """
+
+        self.numVertices = len(colors)
+        self._colors = colors
+        self._adjacency = adjacency
+
+        self.certificate = None
+        self.labeling = None
+        self.generators = []
+        self._groupOrder = None
+
+        # Information about the first and best leaves of the search tree, as (path, labeling, certificate)
+        self._firstLeaf = None
+        self._bestLeaf = None
+
+        self._search()
+
+    # Returns the certificate of the graph when its vertices are placed in the order given by labeling
+    def certificateUnder(self, labeling: list):
+        position = [0] * self.numVertices
+        for i, v in enumerate(labeling):
+            position[v] = i
+
+        edges = []
+        for v in range(self.numVertices):
+            for u, multiplicity in self._adjacency[v].items():
+                if v < u:
+                    i, j = position[v], position[u]
+                    edges.append((i, j, multiplicity) if i < j else (j, i, multiplicity))
+        edges.sort()
+
+        return tuple(self._colors[v] for v in labeling), tuple(edges)
+
+    # Replaces the given colors by their ranks, so that the colors become 0, 1, ..., k-1 and their order is preserved.
+    @staticmethod
+    def _rank(keys: list):
+        ranks = {key: i for i, key in enumerate(sorted(set(keys)))}
+        return [ranks[key] for key in keys]
+
+    # Refines the given coloring until it is equitable: any two vertices of the same color have the same number of
+    # edges into each color class. The refined coloring only depends on the isomorphism class of the colored graph.
+    def _refine(self, coloring: list):
+        numColors = len(set(coloring))
+        while numColors < self.numVertices:
+            signatures = [
+                (coloring[v], tuple(sorted((coloring[u], m) for u, m in self._adjacency[v].items())))
+                for v in range(self.numVertices)
+            ]
+            coloring = self._rank(signatures)
+            newNumColors = max(coloring) + 1
+            if newNumColors == numColors:
+                break
+            numColors = newNumColors
+        return coloring
+
+    # Gives v a color of its own, placed just before the remainder of its color class
+    def _individualize(self, coloring: list, v: int):
+        return self._rank([(coloring[u], 0 if u == v else 1) for u in range(self.numVertices)])
+
+    # Returns the first color class with more than one vertex, or None if the coloring is discrete
+    @staticmethod
+    def _targetCell(coloring: list):
+        sizes = {}
+        for c in coloring:
+            sizes[c] = sizes.get(c, 0) + 1
+        nonSingletons = [c for c in sizes if sizes[c] > 1]
+        if not nonSingletons:
+            return None
+        targetColor = min(nonSingletons)
+        return [v for v in range(len(coloring)) if coloring[v] == targetColor]
+
+    # Returns the orbits of the group generated by the known automorphisms that fix every vertex of path.
+    # The orbits are returned as a list mapping each vertex to a representative of its orbit.
+    def _orbitsFixing(self, path: list):
+        parent = list(range(self.numVertices))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for generator in self.generators:
+            if all(generator[v] == v for v in path):
+                for v in range(self.numVertices):
+                    a, b = find(v), find(generator[v])
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+        return [find(v) for v in range(self.numVertices)]
+
+    # Returns the orbits of the automorphism group, as a list mapping each vertex to the smallest vertex in its orbit
+    def getOrbits(self):
+        return self._orbitsFixing([])
+
+    # Returns the orbit of the unordered pair {u, v} under the automorphism group, as a set of sorted pairs
+    def getPairOrbit(self, u: int, v: int):
+        orbit = {(min(u, v), max(u, v))}
+        frontier = list(orbit)
+        while frontier:
+            a, b = frontier.pop()
+            for generator in self.generators:
+                x, y = generator[a], generator[b]
+                image = (x, y) if x <= y else (y, x)
+                if image not in orbit:
+                    orbit.add(image)
+                    frontier.append(image)
+        return orbit
+
+    @property
+    def groupOrder(self):
+        """
+        The order of the automorphism group, found from the generators by the Schreier-Sims algorithm.
+        """
+
+        if self._groupOrder is None:
+            self._groupOrder = self._schreierSimsOrder()
+        return self._groupOrder
+
+    # Builds a base and strong generating set of the group generated by self.generators, and returns the product of
+    # the sizes of the basic orbits. Permutations are tuples, and the product p * q applies q first.
+    def _schreierSimsOrder(self):
+        identity = tuple(range(self.numVertices))
+        strong = [tuple(p) for p in self.generators if tuple(p) != identity]
+        base = []
+
+        def multiply(p, q):
+            return tuple(p[x] for x in q)
+
+        def inverse(p):
+            result = [0] * len(p)
+            for x, y in enumerate(p):
+                result[y] = x
+            return tuple(result)
+
+        def movedPoint(p):
+            return next(x for x in identity if p[x] != x)
+
+        for p in strong:
+            if all(p[b] == b for b in base):
+                base.append(movedPoint(p))
+
+        while True:
+            # levels[i] is the list of strong generators fixing base[:i], and transversals[i][x] is one of their
+            # products mapping base[i] to x
+            levels = [[p for p in strong if all(p[b] == b for b in base[:i])] for i in range(len(base))]
+            transversals = []
+            for i, b in enumerate(base):
+                transversal = {b: identity}
+                frontier = [b]
+                while frontier:
+                    x = frontier.pop()
+                    for p in levels[i]:
+                        if p[x] not in transversal:
+                            transversal[p[x]] = multiply(p, transversal[x])
+                            frontier.append(p[x])
+                transversals.append(transversal)
+
+            # Sifts p through the levels from start, and returns the remainder with the level at which it got stuck
+            def sift(p, start):
+                for j in range(start, len(base)):
+                    x = p[base[j]]
+                    if x not in transversals[j]:
+                        return p, j
+                    p = multiply(inverse(transversals[j][x]), p)
+                return p, len(base)
+
+            # By Sims' criterion, the chain is complete once every Schreier generator sifts to the identity
+            newGenerator = None
+            for i in reversed(range(len(base))):
+                for x, t in transversals[i].items():
+                    for p in levels[i]:
+                        schreierGenerator = multiply(inverse(transversals[i][p[x]]), multiply(p, t))
+                        remainder, j = sift(schreierGenerator, i + 1)
+                        if remainder != identity:
+                            newGenerator = remainder
+                            if j == len(base):
+                                base.append(movedPoint(remainder))
+                            break
+                    if newGenerator is not None:
+                        break
+                if newGenerator is not None:
+                    break
+
+            if newGenerator is None:
+                order = 1
+                for transversal in transversals:
+                    order *= len(transversal)
+                return order
+
+            strong.append(newGenerator)
+
+    @staticmethod
+    def _commonPrefixLength(path1: list, path2: list):
+        length = 0
+        for a, b in zip(path1, path2):
+            if a != b:
+                break
+            length += 1
+        return length
+
+    def _search(self):
+        if self.numVertices == 0:
+            self.labeling = []
+            self.certificate = self.certificateUnder([])
+            return
+
+        self._explore(self._refine(self._rank(self._colors)), [])
+
+        _, self.labeling, self.certificate = self._bestLeaf
+
+    # Explores the subtree of the search tree rooted at the node given by coloring and path (the sequence of
+    # individualized vertices). Returns None, or the depth of an ancestor to which the search should jump back because
+    # the rest of the subtree is known to be the image of an explored subtree under an automorphism.
+    def _explore(self, coloring: list, path: list):
+        cell = self._targetCell(coloring)
+        if cell is None:
+            return self._processLeaf(coloring, path)
+
+        depth = len(path)
+        explored = []
+        orbits = None
+        numGenerators = -1
+
+        for v in cell:
+            if explored:
+                # Only recompute the orbits when new automorphisms have been found
+                if numGenerators != len(self.generators):
+                    orbits = self._orbitsFixing(path)
+                    numGenerators = len(self.generators)
+                if any(orbits[v] == orbits[u] for u in explored):
+                    continue
+            explored.append(v)
+
+            jump = self._explore(self._refine(self._individualize(coloring, v)), path + [v])
+            if jump is not None and jump < depth:
+                return jump
+
+        return None
+
+    def _processLeaf(self, coloring: list, path: list):
+        labeling = [0] * self.numVertices
+        for v in range(self.numVertices):
+            labeling[coloring[v]] = v
+        certificate = self.certificateUnder(labeling)
+
+        if self._firstLeaf is None:
+            self._firstLeaf = self._bestLeaf = (path, labeling, certificate)
+            return None
+
+        # A leaf equivalent to the first or best leaf yields an automorphism, and the rest of the current branch
+        # is the image of an explored branch.
+        for leafPath, leafLabeling, leafCertificate in (self._firstLeaf, self._bestLeaf):
+            if certificate == leafCertificate:
+                automorphism = [0] * self.numVertices
+                for i in range(self.numVertices):
+                    automorphism[leafLabeling[i]] = labeling[i]
+                self.generators.append(automorphism)
+                return self._commonPrefixLength(path, leafPath)
+
+        if certificate < self._bestLeaf[2]:
+            self._bestLeaf = (path, labeling, certificate)
+
+        return None
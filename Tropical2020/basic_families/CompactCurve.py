@@ -0,0 +1,584 @@
+import itertools
+
+from .BasicFamily import *
+
+
+class CompactCurve(object):
+    """
+    An immutable combinatorial curve stored as flat integer tuples.
+
+    The vertices of a compact curve are the integers ``0, ..., numVertices - 1``. Edge ``i`` joins ``edgeVert1[i]`` and
+    ``edgeVert2[i]``, and leg ``j`` is rooted at ``legRoots[j]``. Legs are not distinguished from one another, and
+    neither are the ends of an edge.
+
+    Compact curves compare and hash by isomorphism class: two compact curves are equal if and only if they are
+    isomorphic. A canonical curve is one whose vertices are in the order given by its
+    :class:`~Tropical2020.basic_families.CanonicalForm.CanonicalForm`, with edges and legs sorted. Isomorphic canonical
+    curves have identical data.
+
+    Attributes
+    ----------
+    genera : tuple
+        the genus of each vertex
+    edgeVert1 : tuple
+        the first endpoint of each edge
+    edgeVert2 : tuple
+        the second endpoint of each edge
+    legRoots : tuple
+        the root of each leg
+    """
+
+    __slots__ = ("genera", "edgeVert1", "edgeVert2", "legRoots", "_isCanonical", "_canonical", "_canonicalForm",
+                 "_automorphismGroup", "_hash")
+
+    def __init__(self, genera, edgeVert1=(), edgeVert2=(), legRoots=(), isCanonical: bool = False):
+        """
+        Parameters
+        ----------
+        genera : iterable
+            the genus of each vertex
+        edgeVert1 : iterable, optional
+            the first endpoint of each edge
+        edgeVert2 : iterable, optional
+            the second endpoint of each edge
+        legRoots : iterable, optional
+            the root of each leg
+        isCanonical : bool, optional
+            promises that the given data is already canonical. Only meant for data produced by :func:`~canonical`.
+        """
+
+        object.__setattr__(self, "genera", tuple(genera))
+        object.__setattr__(self, "edgeVert1", tuple(edgeVert1))
+        object.__setattr__(self, "edgeVert2", tuple(edgeVert2))
+        object.__setattr__(self, "legRoots", tuple(legRoots))
+        object.__setattr__(self, "_isCanonical", isCanonical)
+        object.__setattr__(self, "_canonical", None)
+        object.__setattr__(self, "_canonicalForm", None)
+        object.__setattr__(self, "_automorphismGroup", None)
+        object.__setattr__(self, "_hash", None)
+
+        assert len(self.edgeVert1) == len(self.edgeVert2), "Every edge needs two endpoints."
+
+    def __setattr__(self, name, value):
+        raise AttributeError("CompactCurve is immutable.")
+
+    def __reduce__(self):
+        return CompactCurve, (self.genera, self.edgeVert1, self.edgeVert2, self.legRoots, self._isCanonical)
+
+    # Encodes the curve as bytes: its numbers of vertices, edges and legs, followed by its data. Every number must be
+    # less than 256.
+    def toBytes(self):
+        return bytes((self.numVertices, self.numEdges, self.numLegs) + self.genera + self.edgeVert1 + self.edgeVert2 +
+                     self.legRoots)
+
+    # Decodes a curve encoded by toBytes
+    @staticmethod
+    def fromBytes(data: bytes, isCanonical: bool = False):
+        numVertices, numEdges = data[0], data[1]
+        edgeStart = 3 + numVertices
+        legStart = edgeStart + 2 * numEdges
+        return CompactCurve(data[3:edgeStart], data[edgeStart:edgeStart + numEdges],
+                            data[edgeStart + numEdges:legStart], data[legStart:], isCanonical=isCanonical)
+
+    # Returns the unique stable curve of genus g with n legs and no edges
+    @staticmethod
+    def seed(g: int, n: int):
+        return CompactCurve((g,), (), (), (0,) * n, isCanonical=True)
+
+    @property
+    def numVertices(self):
+        return len(self.genera)
+
+    @property
+    def numEdges(self):
+        return len(self.edgeVert1)
+
+    @property
+    def numLegs(self):
+        return len(self.legRoots)
+
+    @property
+    def vertices(self):
+        return range(len(self.genera))
+
+    @property
+    def genus(self):
+        return self.numEdges - self.numVertices + 1 + sum(self.genera)
+
+    @property
+    def isCanonical(self):
+        return self._isCanonical
+
+    # Returns the number of endpoints of edges and legs at v
+    def degree(self, v: int):
+        return self.edgeVert1.count(v) + self.edgeVert2.count(v) + self.legRoots.count(v)
+
+    # Returns the neighbors of v other than v itself, listed with multiplicity
+    def getNeighbors(self, v: int):
+        neighbors = []
+        for a, b in zip(self.edgeVert1, self.edgeVert2):
+            if a != b:
+                if a == v:
+                    neighbors.append(b)
+                elif b == v:
+                    neighbors.append(a)
+        return neighbors
+
+    # Returns the characteristics (d_e, d_l, g, l) of all vertices, in the sense of
+    # BasicFamily.getVertexCharacteristic
+    def getVertexCharacteristics(self):
+        edgeDegrees = [0] * self.numVertices
+        legDegrees = [0] * self.numVertices
+        loops = [0] * self.numVertices
+        for a, b in zip(self.edgeVert1, self.edgeVert2):
+            edgeDegrees[a] += 1
+            edgeDegrees[b] += 1
+            if a == b:
+                loops[a] += 1
+        for r in self.legRoots:
+            legDegrees[r] += 1
+        return [(edgeDegrees[v], legDegrees[v], self.genera[v], loops[v]) for v in self.vertices]
+
+    def getVertexCharacteristic(self, v: int):
+        edgeDegree = loops = 0
+        for a, b in zip(self.edgeVert1, self.edgeVert2):
+            edgeDegree += (a == v) + (b == v)
+            loops += (a == v and b == v)
+        return edgeDegree, self.legRoots.count(v), self.genera[v], loops
+
+    # Returns the list of dictionaries adjacency[v][u] = number of edges between v and u != v
+    def getAdjacency(self):
+        adjacency = [{} for _ in self.genera]
+        for a, b in zip(self.edgeVert1, self.edgeVert2):
+            if a != b:
+                adjacency[a][b] = adjacency[a].get(b, 0) + 1
+                adjacency[b][a] = adjacency[b].get(a, 0) + 1
+        return adjacency
+
+    @property
+    def canonicalForm(self):
+        """
+        The :class:`~Tropical2020.basic_families.CanonicalForm.CanonicalForm` of the curve. It is computed on first
+        access.
+        """
+
+        if self._canonicalForm is None:
+            object.__setattr__(self, "_canonicalForm",
+                               CanonicalForm(self.getVertexCharacteristics(), self.getAdjacency()))
+        return self._canonicalForm
+
+    def automorphismGroup(self):
+        """
+        Returns the :class:`~Tropical2020.basic_families.AutomorphismGroup.AutomorphismGroup` of the curve, whose
+        automorphisms act on the vertices ``v`` and half-edges ``(i, n)`` of the curve. It is computed on first call.
+        """
+
+        if self._automorphismGroup is None:
+            object.__setattr__(self, "_automorphismGroup", AutomorphismGroup(
+                self.canonicalForm, list(self.vertices), list(range(self.numEdges)),
+                list(zip(self.edgeVert1, self.edgeVert2)), [self.legRoots.count(v) for v in self.vertices]))
+        return self._automorphismGroup
+
+    # Returns the order of the automorphism group of the curve, without building the group if it is not known yet
+    def getAutomorphismGroupOrder(self):
+        if self._automorphismGroup is not None:
+            return self._automorphismGroup.order
+        return AutomorphismGroup.getOrder(self.canonicalForm.groupOrder, zip(self.edgeVert1, self.edgeVert2),
+                                          [self.legRoots.count(v) for v in self.vertices])
+
+    def canonicalize(self):
+        """
+        Returns the canonical curve isomorphic to this curve, along with the isomorphism used.
+
+        Returns
+        -------
+        tuple
+            ``(canonicalCurve, vertexMap, edgeMap)``, where vertex ``v`` and edge ``i`` of this curve correspond to
+            vertex ``vertexMap[v]`` and edge ``edgeMap[i]`` of ``canonicalCurve``
+        """
+
+        labeling = self.canonicalForm.labeling
+        vertexMap = [0] * self.numVertices
+        for i, v in enumerate(labeling):
+            vertexMap[v] = i
+
+        # Relabel each edge so that its first endpoint is the smaller one, and then sort the edges
+        relabeledEdges = []
+        for i, (a, b) in enumerate(zip(self.edgeVert1, self.edgeVert2)):
+            a, b = vertexMap[a], vertexMap[b]
+            relabeledEdges.append((min(a, b), max(a, b), i))
+        relabeledEdges.sort()
+
+        edgeMap = [0] * self.numEdges
+        for newIndex, (_, _, oldIndex) in enumerate(relabeledEdges):
+            edgeMap[oldIndex] = newIndex
+
+        canonicalCurve = CompactCurve(
+            tuple([self.genera[v] for v in labeling]),
+            tuple([a for (a, _, _) in relabeledEdges]),
+            tuple([b for (_, b, _) in relabeledEdges]),
+            tuple(sorted([vertexMap[r] for r in self.legRoots])),
+            isCanonical=True
+        )
+
+        return canonicalCurve, vertexMap, edgeMap
+
+    # Returns the canonical curve isomorphic to this curve
+    def canonical(self):
+        if self._isCanonical:
+            return self
+        if self._canonical is None:
+            object.__setattr__(self, "_canonical", self.canonicalize()[0])
+        return self._canonical
+
+    @property
+    def canonicalCertificate(self):
+        """
+        A hashable certificate of the isomorphism class of the curve: two compact curves are isomorphic if and only if
+        their certificates are equal. It is the data of the canonical curve.
+        """
+
+        c = self.canonical()
+        return c.genera, c.edgeVert1, c.edgeVert2, c.legRoots
+
+    def isIsomorphicTo(self, other):
+        if isinstance(other, BasicFamily):
+            other = CompactCurve.fromBasicFamily(other)
+        return self.canonicalCertificate == other.canonicalCertificate
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactCurve):
+            return NotImplemented
+        return self.canonicalCertificate == other.canonicalCertificate
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(self.canonicalCertificate))
+        return self._hash
+
+    def __repr__(self):
+        return "CompactCurve(" + ", ".join(
+            repr(x) for x in (self.genera, self.edgeVert1, self.edgeVert2, self.legRoots)) + ")"
+
+    # Returns the half-edges at v. Endpoint n (1 or 2) of edge i is the half-edge 2 * i + n - 1, and leg j is the
+    # half-edge 2 * numEdges + j.
+    def getHalfEdges(self, v: int):
+        halfEdges = []
+        for i, (a, b) in enumerate(zip(self.edgeVert1, self.edgeVert2)):
+            if a == v:
+                halfEdges.append(2 * i)
+            if b == v:
+                halfEdges.append(2 * i + 1)
+        for j, r in enumerate(self.legRoots):
+            if r == v:
+                halfEdges.append(2 * self.numEdges + j)
+        return halfEdges
+
+    def getSplittingSpecialization(self, v: int, g1: int, S):
+        """
+        Splits vertex ``v`` into ``v`` and a new last vertex joined by a new last edge.
+
+        The half-edges in ``S`` stay at ``v``, which keeps genus ``g1``. The other half-edges at ``v`` move to the new
+        vertex, which takes the rest of the genus of ``v``.
+        """
+
+        genera = list(self.genera)
+        edgeVert1 = list(self.edgeVert1)
+        edgeVert2 = list(self.edgeVert2)
+        legRoots = list(self.legRoots)
+
+        w = self.numVertices
+        genera[v] = g1
+        genera.append(self.genera[v] - g1)
+
+        for h in self.getHalfEdges(v):
+            if h not in S:
+                if h >= 2 * self.numEdges:
+                    legRoots[h - 2 * self.numEdges] = w
+                elif h % 2 == 0:
+                    edgeVert1[h // 2] = w
+                else:
+                    edgeVert2[h // 2] = w
+
+        edgeVert1.append(v)
+        edgeVert2.append(w)
+
+        return CompactCurve(genera, edgeVert1, edgeVert2, legRoots)
+
+    def getGenusReductionSpecialization(self, v: int):
+        """
+        Reduces the genus of vertex ``v`` by one and adds a new last edge which is a loop at ``v``.
+        """
+
+        assert self.genera[v] > 0
+        genera = list(self.genera)
+        genera[v] -= 1
+        return CompactCurve(genera, self.edgeVert1 + (v,), self.edgeVert2 + (v,), self.legRoots)
+
+    def getSpecializations(self):
+        """
+        Yields the stable one-step specializations of the curve, obtained by splitting vertices and by reducing the
+        genus of vertices. Some of them may be isomorphic to each other.
+        """
+
+        for v in self.vertices:
+            genus = self.genera[v]
+
+            # If the genus of v is greater than 1, then we can decrement its genus and add a self loop.
+            # If the genus of v is exactly 1, we need to make sure that stability is preserved.
+            if genus > 1 or (genus == 1 and self.degree(v) > 0):
+                yield self.getGenusReductionSpecialization(v)
+
+            # We can also split v in two and pass around parts of its genus and half-edges to the new pieces.
+            # (S, T) and (T, S) produce the same splitting, so only take |S| <= |T|.
+            halfEdges = self.getHalfEdges(v)
+            for mask in range(2 ** len(halfEdges)):
+                S = {h for k, h in enumerate(halfEdges) if mask >> k & 1}
+                sizeS, sizeT = len(S), len(halfEdges) - len(S)
+                if sizeS > sizeT:
+                    continue
+                for g1 in range(genus + 1):
+                    # Make sure that the splitting specialization will be stable
+                    if not ((g1 == 0 and sizeS < 2) or (g1 == genus and sizeT < 2)):
+                        yield self.getSplittingSpecialization(v, g1, S)
+
+    # Yields the splitting specializations at v, one for each orbit of splittings under the automorphisms that fix
+    # every vertex. These permute legs, permute parallel edges, and flip loops, so a splitting only matters up to how
+    # many legs, loops, loop ends, and edges to each neighbor stay at v.
+    def getSplittingRepresentatives(self, v: int):
+        genus = self.genera[v]
+        numEdges = self.numEdges
+
+        legs = [2 * numEdges + j for j, r in enumerate(self.legRoots) if r == v]
+        loops = []
+        edgesToNeighbors = {}
+        for i, (a, b) in enumerate(zip(self.edgeVert1, self.edgeVert2)):
+            if a == b == v:
+                loops.append(i)
+            elif a == v:
+                edgesToNeighbors.setdefault(b, []).append(2 * i)
+            elif b == v:
+                edgesToNeighbors.setdefault(a, []).append(2 * i + 1)
+        edgeGroups = list(edgesToNeighbors.values())
+        degree = len(legs) + 2 * len(loops) + sum(len(group) for group in edgeGroups)
+
+        for numLegs in range(len(legs) + 1):
+            for numLoops in range(len(loops) + 1):
+                for numSplitLoops in range(len(loops) - numLoops + 1):
+                    for numEdgesKept in itertools.product(*(range(len(group) + 1) for group in edgeGroups)):
+                        # The first numLoops loops stay at v, and the next numSplitLoops loops have one end at v
+                        S = set(legs[:numLegs])
+                        for i in loops[:numLoops]:
+                            S.update((2 * i, 2 * i + 1))
+                        for i in loops[numLoops:numLoops + numSplitLoops]:
+                            S.add(2 * i)
+                        for group, k in zip(edgeGroups, numEdgesKept):
+                            S.update(group[:k])
+
+                        # (S, T) and (T, S) produce the same splitting, so only take |S| <= |T|.
+                        sizeS, sizeT = len(S), degree - len(S)
+                        if sizeS > sizeT:
+                            continue
+                        for g1 in range(genus + 1):
+                            # Make sure that the splitting specialization will be stable
+                            if not ((g1 == 0 and sizeS < 2) or (g1 == genus and sizeT < 2)):
+                                yield self.getSplittingSpecialization(v, g1, S)
+
+    def getAugmentations(self):
+        """
+        Yields one-step specializations of the curve, with at least one specialization from each orbit of
+        specializations under the automorphism group of the curve. The new edge of each specialization is its last
+        edge.
+
+        Only one vertex of each orbit of vertices is specialized, and splittings which differ by an automorphism fixing
+        every vertex are only produced once. Some of the results may still be isomorphic to each other.
+        """
+
+        orbits = self.canonicalForm.getOrbits()
+        for v in self.vertices:
+            if orbits[v] != v:
+                continue
+
+            genus = self.genera[v]
+            if genus > 1 or (genus == 1 and self.degree(v) > 0):
+                yield self.getGenusReductionSpecialization(v)
+
+            yield from self.getSplittingRepresentatives(v)
+
+    def isCanonicalAugmentation(self):
+        """
+        Checks whether the last edge of the curve is its canonical parent edge, up to automorphism.
+
+        The canonical parent edge is chosen among the edges maximizing a cheap invariant (the characteristics of the
+        endpoints, and the number of parallel edges), as the one whose endpoints come last in the canonical order. The
+        canonical form is only computed when the invariant does not already decide the question.
+
+        If the curves with ``k`` edges are pairwise non-isomorphic, and each of them is specialized by
+        :func:`~getAugmentations`, then every curve with ``k + 1`` edges passes this test as a specialization of
+        exactly one of them. Its other appearances, as specializations of other curves, all fail.
+        """
+
+        if self.numEdges == 0:
+            return False
+
+        characteristics = self.getVertexCharacteristics()
+        multiplicities = {}
+        for a, b in zip(self.edgeVert1, self.edgeVert2):
+            pair = (a, b) if a <= b else (b, a)
+            multiplicities[pair] = multiplicities.get(pair, 0) + 1
+
+        def invariant(pair):
+            a, b = pair
+            return max(characteristics[a], characteristics[b]), min(characteristics[a], characteristics[b]), \
+                multiplicities[pair]
+
+        a, b = self.edgeVert1[-1], self.edgeVert2[-1]
+        newPair = (a, b) if a <= b else (b, a)
+        newInvariant = invariant(newPair)
+
+        candidates = []
+        for pair in multiplicities:
+            pairInvariant = invariant(pair)
+            if pairInvariant > newInvariant:
+                return False
+            if pairInvariant == newInvariant:
+                candidates.append(pair)
+        if len(candidates) == 1:
+            return True
+
+        # Break the tie with the canonical order of the vertices
+        form = self.canonicalForm
+        position = [0] * self.numVertices
+        for i, u in enumerate(form.labeling):
+            position[u] = i
+        parentPair = max(candidates, key=lambda pair: sorted((position[pair[0]], position[pair[1]]), reverse=True))
+
+        return parentPair in form.getPairOrbit(*newPair)
+
+    # Returns a list mapping each edge to the first edge of its class, where parallel edges are in the same class.
+    # If the canonical form of the curve is already known, then edges exchanged by an automorphism are also in the
+    # same class, so that the classes are the orbits of the automorphism group. (Computing the canonical form just for
+    # this costs more than it usually saves.)
+    def getEdgeOrbits(self):
+        firstEdgeWithEndpoints = {}
+        for i, (a, b) in enumerate(zip(self.edgeVert1, self.edgeVert2)):
+            firstEdgeWithEndpoints.setdefault((a, b) if a <= b else (b, a), i)
+        representatives = dict(firstEdgeWithEndpoints)
+
+        form = self._canonicalForm
+        if form is not None and form.generators:
+            assigned = set()
+            for pair, i in firstEdgeWithEndpoints.items():
+                if pair not in assigned:
+                    for image in form.getPairOrbit(*pair):
+                        if image in firstEdgeWithEndpoints:
+                            representatives[image] = i
+                            assigned.add(image)
+
+        return [representatives[(a, b) if a <= b else (b, a)] for a, b in zip(self.edgeVert1, self.edgeVert2)]
+
+    # Returns the edges of the canonical curve isomorphic to this curve (see canonical) which correspond to edges in
+    # the orbit of edge i under the automorphism group of this curve
+    def getCanonicalEdgeOrbit(self, i: int):
+        form = self.canonicalForm
+        canonicalCurve = self.canonical()
+
+        # The position of each vertex in the canonical curve, as in canonicalize
+        if self._isCanonical:
+            position = list(self.vertices)
+        else:
+            position = [0] * self.numVertices
+            for p, v in enumerate(form.labeling):
+                position[v] = p
+
+        pairs = set()
+        for (a, b) in form.getPairOrbit(self.edgeVert1[i], self.edgeVert2[i]):
+            a, b = position[a], position[b]
+            pairs.add((a, b) if a <= b else (b, a))
+
+        return [k for k, pair in enumerate(zip(canonicalCurve.edgeVert1, canonicalCurve.edgeVert2)) if pair in pairs]
+
+    def getContraction(self, i: int):
+        """
+        Returns the curve obtained by contracting edge ``i``. If the edge joins distinct vertices, the second of them
+        is merged into the first, and vertices after it are shifted down by one.
+        """
+
+        a, b = self.edgeVert1[i], self.edgeVert2[i]
+        genera = list(self.genera)
+        if a == b:
+            genera[a] += 1
+            return CompactCurve(genera,
+                                self.edgeVert1[:i] + self.edgeVert1[i + 1:],
+                                self.edgeVert2[:i] + self.edgeVert2[i + 1:],
+                                self.legRoots)
+
+        genera[a] += genera[b]
+        del genera[b]
+
+        def move(u):
+            if u == b:
+                u = a
+            return u - 1 if u > b else u
+
+        return CompactCurve(genera,
+                            (move(u) for j, u in enumerate(self.edgeVert1) if j != i),
+                            (move(u) for j, u in enumerate(self.edgeVert2) if j != i),
+                            (move(u) for u in self.legRoots))
+
+    @staticmethod
+    def fromBasicFamily(curve: BasicFamily, returnOrders: bool = False):
+        """
+        Builds a compact curve from a basic family. Edge lengths and names are forgotten.
+
+        If ``returnOrders`` is set, then the lists of vertices and edges of ``curve`` (ordered as in the compact
+        curve) are also returned.
+        """
+
+        vertices = list(curve.vertices)
+        edges = list(curve.edges)
+        index = {v: i for i, v in enumerate(vertices)}
+
+        assert all(e.vert1 is not None and e.vert2 is not None for e in edges), \
+            "Compact curves can't represent edges without endpoints."
+
+        compactCurve = CompactCurve((v.genus for v in vertices),
+                                    (index[e.vert1] for e in edges),
+                                    (index[e.vert2] for e in edges),
+                                    (index[nextLeg.root] for nextLeg in curve.legs))
+
+        if returnOrders:
+            return compactCurve, vertices, edges
+        else:
+            return compactCurve
+
+    def toBasicFamily(self, name: str = "", returnOrders: bool = False):
+        """
+        Builds a basic family from the compact curve.
+
+        Vertex ``i`` is named ``vi``, and edges and legs are named after their endpoints, as in
+        :func:`~Tropical2020.basic_families.BasicFamily.BasicFamily.simplifyNames`. Each edge has its own generator of
+        a free monoid as its length.
+
+        If ``returnOrders`` is set, then the lists of vertices and edges of the basic family (ordered as in the compact
+        curve) are also returned.
+        """
+
+        curve = BasicFamily(name)
+        vertices = [Vertex("v" + str(i), g) for i, g in enumerate(self.genera)]
+
+        edges = []
+        for i, (a, b) in enumerate(zip(self.edgeVert1, self.edgeVert2)):
+            generator = "e" + str(i)
+            curve.monoid.addgen(generator)
+            edges.append(Edge("edge(" + vertices[a].name + ", " + vertices[b].name + ")",
+                              curve.monoid.Element({generator: 1}), vertices[a], vertices[b]))
+
+        curve.addVertices(set(vertices))
+        curve.addEdges(set(edges))
+        curve.addLegs({Leg("leg(" + vertices[r].name + ")", vertices[r]) for r in self.legRoots})
+
+        if returnOrders:
+            return curve, vertices, edges
+        else:
+            return curve
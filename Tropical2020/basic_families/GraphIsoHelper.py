@@ -130,5 +130,5 @@ class GraphIsoHelper(object):
             # print(other.vertexEverythingDict)
             return False
 
-        # print("Easy tests were inconclusive - switching to brute force")
-        return domain.isBruteForceIsomorphicTo(codomain)
+        # The easy tests were inconclusive, so compare canonical forms
+        return domain.canonicalCertificate == codomain.canonicalCertificate
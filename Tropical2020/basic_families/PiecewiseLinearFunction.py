@@ -141,14 +141,16 @@ class PiecewiseLinearFunction(object):
         # print("S:", foundAnSVertex, "T:", foundATVertex)
         return False
 
-    # Returns twice the integral of self over the supplied path
-    def doubleIntegrateOverLoop(self, loop):
+    # Returns the edges of the supplied loop, each paired with 1 if the loop passes over it from vert1 to vert2 and -1
+    # otherwise
+    @staticmethod
+    def _getLoopOrientation(loop):
         if len(loop) == 0:
-            return self.domain.monoid.zero()
+            return []
         if len(loop) == 1:
             if loop[0].vert1 != loop[0].vert2:
                 raise ValueError("The supplied list of edges is not a loop.")
-            return self.functionValues[loop[0]] * loop[0].length
+            return [(loop[0], 1)]
 
         # Loops of length 2 are weird...
         if len(loop) == 2:
@@ -156,13 +158,13 @@ class PiecewiseLinearFunction(object):
                 raise ValueError("The supplied list of edges is not a loop.")
             # Orientation is regular
             if loop[0].vert2 == loop[1].vert1:
-                return self.functionValues[loop[0]] * loop[0].length + self.functionValues[loop[1]] * loop[1].length
+                return [(loop[0], 1), (loop[1], 1)]
             else:
-                return self.functionValues[loop[0]] * loop[0].length - self.functionValues[loop[1]] * loop[1].length
+                return [(loop[0], 1), (loop[1], -1)]
 
-        integral = self.domain.monoid.zero()
+        orientation = []
 
-        # Integrate over everything except for the very last edge of the path
+        # Orient everything except for the very last edge of the path
         for edgeIndex in range(len(loop) - 1):
             currentEdge = loop[edgeIndex]
             nextEdge = loop[edgeIndex + 1]
@@ -172,12 +174,9 @@ class PiecewiseLinearFunction(object):
             connectingVertex = currentEdge.vertices.intersection(nextEdge.vertices).pop()
 
             # Passing over currentEdge from vert1 to vert 2 <=> normal orientation
-            if connectingVertex == currentEdge.vert2:
-                integral += self.functionValues[currentEdge] * currentEdge.length
-            else:
-                integral += (-1 * self.functionValues[currentEdge]) * currentEdge.length
+            orientation.append((currentEdge, 1 if connectingVertex == currentEdge.vert2 else -1))
 
-        # Integrate over the very last edge
+        # Orient the very last edge
         secondToLastEdge = loop[len(loop) - 2]
         lastEdge = loop[len(loop) - 1]
         if len(secondToLastEdge.vertices.intersection(lastEdge.vertices)) == 0:
@@ -185,16 +184,33 @@ class PiecewiseLinearFunction(object):
         connectingVertex = secondToLastEdge.vertices.intersection(lastEdge.vertices).pop()
 
         # Passing over lastEdge from vert1 to vert 2 <=> normal orientation
-        if connectingVertex == lastEdge.vert1:
-            integral += self.functionValues[lastEdge] * lastEdge.length
-        else:
-            integral += (-1 * self.functionValues[lastEdge]) * lastEdge.length
+        orientation.append((lastEdge, 1 if connectingVertex == lastEdge.vert1 else -1))
+
+        return orientation
 
+    # Returns twice the integral of self over the supplied path
+    def doubleIntegrateOverLoop(self, loop):
+        integral = self.domain.monoid.zero()
+        for edge, sign in self._getLoopOrientation(loop):
+            integral = integral + (sign * self.functionValues[edge]) * edge.length
         return integral
 
+    # The integrals over all loops are computed at once, as the product of the matrix of signed slopes of the loops
+    # with the dense vector of edge lengths
     def assertIsWellDefined(self):
-        for l in self.domain.loops:
-            assert self.doubleIntegrateOverLoop(l) == self.domain.monoid.zero()
+        loops = self.domain.loops
+        if not loops:
+            return
+
+        edges = list(self.domain.edges)
+        edgeIndex = {e: k for k, e in enumerate(edges)}
+        weights = np.zeros((len(loops), len(edges)), dtype=object)
+        for i, loop in enumerate(loops):
+            for edge, sign in self._getLoopOrientation(loop):
+                weights[i, edgeIndex[edge]] += sign * self.functionValues[edge]
+
+        lengths = self.domain.monoid.todense(e.length for e in edges)
+        assert lengths.combine(weights).iszero().all()
 
     def getSpecialSupport(self):
 
@@ -1,7 +1,9 @@
 
 import math
-import itertools
 import copy
+import functools
+
+import numpy as np
 
 def gcd( a, b ):
 	while a:
@@ -11,6 +13,154 @@ def gcd( a, b ):
 def lcm( a, b ):
 	return a*b/gcd(a,b)
 
+@functools.lru_cache( maxsize=256 )
+def compute_facets( constraints ):
+	# returns integer generators of the cone { y : a . y >= 0 for every a in
+	# constraints }, where constraints is a tuple of integer tuples of the
+	# same length, by the double description method
+	# the cone is the span of the vectors in lineality plus the nonnegative
+	# span of the vectors in rays; zeros[k] is the set of constraints, as a
+	# bitmask, which vanish on rays[k]
+	if not constraints:
+		return ()
+	dim = len( constraints[0] )
+	lineality = [ tuple( int( i == j ) for j in range( dim ) ) for i in range( dim ) ]
+	rays = []
+	zeros = []
+
+	def dot( a, y ):
+		return sum( u * v for u, v in zip( a, y ) )
+
+	def combine( s, y, t, z ):
+		# the primitive integer vector s * y + t * z
+		w = [ s * u + t * v for u, v in zip( y, z ) ]
+		d = 0
+		for u in w: d = math.gcd( d, u )
+		return tuple( u // d for u in w ) if d else tuple( w )
+
+	for i, a in enumerate( constraints ):
+		bit = 1 << i
+		j = next( ( j for j, l in enumerate( lineality ) if dot( a, l ) ), None )
+		if j is not None:
+			# a is not constant on the lineality space: the cone keeps the half
+			# of lineality[j] where a is positive, and everything else is moved
+			# into the kernel of a
+			l = lineality.pop( j )
+			if dot( a, l ) < 0:
+				l = tuple( -u for u in l )
+			al = dot( a, l )
+			lineality = [ combine( al, m, -dot( a, m ), l ) for m in lineality ]
+			rays = [ combine( al, r, -dot( a, r ), l ) for r in rays ]
+			zeros = [ z | bit for z in zeros ]
+			# l vanishes on the earlier constraints, like all of the lineality
+			rays.append( l )
+			zeros.append( bit - 1 )
+			continue
+
+		values = [ dot( a, r ) for r in rays ]
+		positive = [ k for k, v in enumerate( values ) if v > 0 ]
+		negative = [ k for k, v in enumerate( values ) if v < 0 ]
+		if not negative:
+			zeros = [ z | bit if v == 0 else z for z, v in zip( zeros, values ) ]
+			continue
+
+		# a pair of rays on either side of a spans a new ray if the rays are
+		# adjacent, that is if no other ray vanishes on all of the constraints
+		# which vanish on both
+		newRays = []
+		newZeros = []
+		for p in positive:
+			for n in negative:
+				z = zeros[p] & zeros[n]
+				if any( ( zeros[k] & z ) == z for k in range( len( rays ) ) if k != p and k != n ):
+					continue
+				newRays.append( combine( values[p], rays[n], -values[n], rays[p] ) )
+				newZeros.append( z | bit )
+
+		kept = [ k for k, v in enumerate( values ) if v >= 0 ]
+		rays = [ rays[k] for k in kept ] + newRays
+		zeros = [ zeros[k] | bit if values[k] == 0 else zeros[k] for k in kept ] + newZeros
+
+	return tuple( rays ) + tuple( lineality ) + tuple( tuple( -u for u in l ) for l in lineality )
+
+class MonoidElement( object ):
+	# elements here mean elements of the group associated to a monoid
+	# a single class serves every monoid; the monoid is stored on the element,
+	# and elements are usually created by Monoid.Element
+	# _normal caches the normal form of the element, along with the
+	# projection it was computed with; it is cleared when the element is
+	# modified in place
+
+	__slots__ = ( "coeffs", "denom", "monoid", "_normal" )
+
+	def __init__( e, m, coeffs, d=1 ):
+		assert isinstance( d, int )
+		assert isinstance( coeffs, dict )
+		for x in coeffs.keys(): assert x in m.gens
+		for n in coeffs.values(): assert isinstance(n,int)
+		e.monoid = m
+		e.coeffs = coeffs
+		e.denom = d
+		e._normal = None
+
+	def __hash__( x ):
+		# equal elements have the same normal form
+		# adding a relation changes the normal forms, and so the hashes, of
+		# existing elements: sets and dicts keyed by elements of a monoid
+		# are invalid after addrel, and must be rebuilt
+		return hash( x.monoid.normalform( x ) )
+	
+	def __add__( self, other ):
+		return self.monoid.add( self, other )
+
+	def __radd__( self, other ):
+		return self.monoid.add( self, other )
+
+	def __iadd__( self, other ):
+		return self.monoid.iadd( self, other )
+
+	def __neg__( self ):
+		return (-1) * self
+
+	def __isub__( self, other ):
+		return self.monoid.isub( self, other )
+
+	def __sub__( self, other ):
+		return self.monoid.sub( self, other )
+
+	def __itruediv__( self, d ):
+		return self.monoid.idiv( self, d )
+
+	def __truediv__( self, d ):
+		return self.monoid.div( self, d )
+
+	def __floordiv__( self, other ):
+		return self.monoid.floordiv( self, other )
+
+	def __ifloordiv__( self, d ):
+		return self.monoid.ifloordiv( self, d )
+
+	def __imul__( self, other ):
+		return self.monoid.iscale( other, self )
+	
+	def __rmul__( self, other ):
+		return self.monoid.scale( other, self )
+
+	def __eq__( self, other ):
+		return self.monoid.eq( self, other )
+
+	def __getitem__( self, key ):
+		return self.coeffs.get(key, 0)
+
+	def copy( self ):
+		return MonoidElement( self.monoid, dict(self.coeffs), self.denom )
+
+	def scalereduce( self ):
+		return self.monoid.scalereduce( self )
+
+	def normalform( self ):
+		return self.monoid.normalform( self )
+
 class Monoid( object ):
 	def __init__( m, gens=[], rels={} ):
 		m.gens = list( gens )		# must store as a list so iterations 
@@ -21,144 +171,168 @@ class Monoid( object ):
 
 		m.dual = None
 
+		# caches of genindex, projection and intern, computed on first use
+		m._genindex = None
+		m._projection = None
+		m._interned = None
+
 		for R in rels:
 			m.addrel( R )
 
-		m.compute_dual()
-
-		class Element( object ):
-			# elements here mean elements of the associated group
-
-			def __init__( e, coeffs, d=1 ):
-				assert isinstance( d, int )
-				assert isinstance( coeffs, dict )
-				for x in coeffs.keys(): assert x in m.gens
-				for n in coeffs.values(): assert isinstance(n,int)
-				e.monoid = m
-				e.coeffs = coeffs
-				e.denom = d
-
-			def __hash__( x ):
-				return hash( x.coeffs.values() )
-			
-			def __add__( self, other ):
-				return m.add( self, other )
-
-			def __radd__( self, other ):
-				return m.add( self, other )
-
-			def __iadd__( self, other ):
-				return m.iadd( self, other )
-
-			def __neg__( self ):
-				return (-1) * self
-
-			def __isub__( self, other ):
-				return m.isub( self, other )
-
-			def __sub__( self, other ):
-				return m.sub( self, other )
-
-			def __itruediv__( self, d ):
-				return m.idiv( self, d )
-
-			def __truediv__( self, d ):
-				return m.div( self, d )
-
-			def __floordiv__( self, other ):
-				return m.floordiv( self, other )
-
-			def __ifloordiv__( self, d ):
-				return m.ifloordiv( self, d )
-
-			def __imul__( self, other ):
-				return m.iscale( other, self )
-			
-			def __rmul__( self, other ):
-				return m.scale( other, self )
-
-			def __eq__( self, other ):
-				return m.eq( self, other )
-
-			def __getitem__( self, key ):
-				return self.coeffs.get(key, 0)
-
-			def copy( self ):
-				return m.Element( dict(self.coeffs), self.denom )
-
-			def scalereduce( self ):
-				return m.scalereduce( self )
-			
-		m.Element = Element
+	def Element( self, coeffs, d=1 ):
+		# creates an element of this monoid; see MonoidElement
+		return MonoidElement( self, coeffs, d )
+
+	def __copy__( self ):
+		# a copy shares the generators, so that elements of either monoid can
+		# be combined, but has its own relations and caches
+		other = Monoid.__new__( Monoid )
+		other.gens = self.gens
+		other.rels = dict( self.rels )
+		other.dual = None
+		other._genindex = None
+		other._projection = None
+		other._interned = None
+		return other
 
 	def zero( self ):
 		return self.Element( { } )
 
+	def genindex( self ):
+		# the position of each generator in self.gens, which orders the
+		# coordinates of dense elements; generators are only ever appended
+		index = self._genindex
+		if index is None or len( index ) != len( self.gens ):
+			index = { x : i for i, x in enumerate( self.gens ) }
+			self._genindex = index
+		return index
+
+	def todense( self, elements ):
+		# packs a sequence of elements into one DenseElements, over the least
+		# common multiple of their denominators
+		elements = list( elements )
+		index = self.genindex()
+		d = 1
+		for x in elements:
+			d = d * x.denom // math.gcd( d, x.denom )
+
+		coeffs = np.zeros( ( len(elements), len(self.gens) ), dtype=object )
+		for i, x in enumerate( elements ):
+			for k, c in x.coeffs.items():
+				coeffs[i, index[k]] = c * ( d // x.denom )
+		return DenseElements( self, coeffs, d )
 
 	def addgen( self, gen ):			# this should be removed;
 										# just make this part of __init__
 		self.gens.append( gen )
 
 	def addrel( self, rel ):
+		# the relations are kept in reduced row echelon form, without
+		# fractions: self.rels[x] is the relation with a positive coefficient
+		# at its pivot x, no coefficient at the other pivots, and coprime
+		# coefficients
+		for x, r in self.rels.items():
+			if rel[x] != 0:
+				rel = r[x]*rel - rel[x]*r
+
+		x = next( ( x for x in self.gens if rel[x] != 0 ), None )
+		if x is None:
+			# the relation already holds
+			return
+		rel = self._primitive( rel, rel[x] )
+
+		# clear the coefficient of the new pivot from the other relations
+		for y, r in self.rels.items():
+			if r[x] != 0:
+				self.rels[y] = self._primitive( rel[x]*r - r[x]*rel, 1 )
+		self.rels[x] = rel
+
+		# the projection and the dual have changed, and are computed again
+		# when they are next used
+		self._projection = None
+		self.dual = None
+
+	def _primitive( self, rel, sign ):
+		# divides rel by the gcd of its coefficients, giving it the sign of
+		# sign, and drops zero coefficients
+		d = 0
+		for v in rel.coeffs.values(): d = math.gcd(d,v)
+		if sign < 0: d = -d
+		return self.Element( { k : v // d for k, v in rel.coeffs.items() if v } )
+
+	def projection( self ):
+		# a linear map from the free group on the generators onto a free
+		# group, whose kernel is spanned by the relations; it is returned as
+		# a dict mapping each generator to its image, a dict of integer
+		# coefficients of the generators which are not pivots
+		# it is computed again when generators or relations are added
+		P = self._projection
+		if P is not None and len( P ) == len( self.gens ):
+			return P
+
+		# the pivot coefficients all divide L, so each generator can be
+		# written as L^-1 times an integer combination of the free generators
+		L = 1
+		for x, r in self.rels.items():
+			L = L * r[x] // math.gcd( L, r[x] )
+
+		P = { }
 		for x in self.gens:
-			if x in self.rels.keys():
-				# if there is already a relation with an x coefficient,
-				# subtract a multiple of that relation to make sure this
-				# relation is in reduced echelon form
-				rel = self.rels[x][x]*rel - rel[x]*self.rels[x]
-			elif rel[x] != 0:
-				# there is no relation with an x coefficient, and this
-				# relation's x coefficient is nonzero, so it is in echelon form
-				# and we can add it
-				d = 0
-				for v in rel.coeffs.values(): d = math.gcd(d,v)
-				self.rels[x] = rel // d
-				break
-		if self.dual:   # if the dual has already been computed, we need to
-						# recompute because the relations have changed
-			self.compute_dual()
+			if x in self.rels:
+				r = self.rels[x]
+				P[x] = { k : -(L // r[x]) * v for k, v in r.coeffs.items() 
+							if k != x and v }
+			else:
+				P[x] = { x : L }
+		self._projection = P
+		return P
+
+	def denseprojection( self ):
+		# the matrix of the projection, with a row for each generator and a
+		# column for each generator, in the order of genindex
+		P = self.projection()
+		index = self.genindex()
+		A = np.zeros( ( len(self.gens), len(self.gens) ), dtype=object )
+		for x, image in P.items():
+			for k, v in image.items():
+				A[index[x], index[k]] = v
+		return DenseElements._fit( A )
+
+	def project( self, x ):
+		# the image of x.denom * x under the projection, without zero
+		# coefficients; x is zero if and only if this is empty
+		P = self.projection()
+		image = { }
+		for k, c in x.coeffs.items():
+			if c:
+				for l, v in P[k].items():
+					image[l] = image.get(l,0) + c * v
+		return { l : v for l, v in image.items() if v }
+
+	def iszero( self, x ):
+		return not self.project( x )
 
 	def compute_dual( M ):
-		M.dual = set()
-
-		basis = [ x for x in M.gens if x not in M.rels.keys() ]
-		dim = len(basis)
-		if dim == 0:
-			return
-
-		reducedgens = { x : M.Element({x:1}).scalereduce() for x in M.gens }
-		pivots = dict()
-
-		# every set of dim(M)-1 elements gives a linear function
-		for T in itertools.combinations(M.gens, dim-1):
-			pivots = dict()
-			# put the elements of T in RREF
-			for x in T:
-				v = reducedgens[x].copy()
-				M.scalereduce( v, pivots )
-				pivots[next(y for y in basis if v[y])] = v
-			
-			# the basis element without a pivot
-			lastcol = next(y for y in basis if y not in pivots)
-
-			def F( v, pivots=pivots, lastcol=lastcol ): # this is the linear function
-				# v is an M.Element
-				# we put v in RREF relative to T
-
-				w = v.copy()
-				M.scalereduce( w )
-				M.scalereduce( w, pivots )
-
-				return w[lastcol] if w.denom >= 0 else -w[lastcol]
-
-			if all( [ F(M.Element({x:1})) >= 0 for x in M.gens ] ):
-				M.dual.add( F )
-			elif all( [ F(M.Element({x:1})) <= 0 for x in M.gens ]):
-				M.dual.add( lambda v : -F( v ) )
-
+		# M.dual is an integer matrix, with a column for each generator in the
+		# order of genindex, whose rows are the facets of the cone spanned by
+		# the generators: an element is nonnegative exactly when all of its
+		# products with the rows are
+		# the facets are found in the coordinates of the projection, so they
+		# only depend on the relations, and are shared by monoids with the
+		# same relations
+		P = M.projection()
+		free = [ x for x in M.gens if x not in M.rels ]
+		constraints = tuple( tuple( P[x].get( f, 0 ) for f in free ) for x in M.gens )
+		facets = compute_facets( constraints ) if free else ()
+
+		dual = np.zeros( ( len(facets), len(M.gens) ), dtype=object )
+		for i, y in enumerate( facets ):
+			for j, a in enumerate( constraints ):
+				dual[i, j] = sum( u * v for u, v in zip( a, y ) )
+		M.dual = DenseElements._fit( dual )
 
 	def add( self, x, y ):
-		assert isinstance( x, self.Element ) and isinstance( y, self.Element )
+		assert isinstance( x, MonoidElement ) and isinstance( y, MonoidElement )
 		return self.Element( 
 				{ k : y.denom * x.coeffs.get(k,0) + x.denom * y.coeffs.get(k,0) 
 					for k in x.coeffs.keys() | y.coeffs.keys() }, 
@@ -168,11 +342,13 @@ class Monoid( object ):
 	def iadd( self, x, y ):
 		for k in y.coeffs.keys():
 			x.coeffs[k] = y.denom * x.coeffs.get(k,0) + x.denom * y.coeffs[k]
+		x._normal = None
 		return x
 
 	def isub( self, x, y ):
 		for k in y.coeffs.keys():
 			x.coeffs[k] = y.denom * x.coeffs.get(k,0) - x.denom * y.coeffs[k] 
+		x._normal = None
 		return x
 
 	def sub( self, x, y ):
@@ -187,16 +363,18 @@ class Monoid( object ):
 		return self
 		
 	def scale( self, n, x ):
-		assert isinstance(n, int) and isinstance( x, self.Element )
+		assert isinstance(n, int) and isinstance( x, MonoidElement )
 		return self.Element( { k : n * x.coeffs[k] for k in x.coeffs.keys() } )
 
 	def iscale( self, n, x ):
 		for k in x.coeffs.keys():
 			x.coeffs[k] *= n
+		x._normal = None
 		return x
 
 	def idiv( self, x, d ):
 		x.denom *= d
+		x._normal = None
 		return x
 
 	def div( self, x, d ):
@@ -218,31 +396,165 @@ class Monoid( object ):
 			z *= rels[w][w]
 			z -= a * rels[w]
 			z.denom *= rels[w][w]
+		z._normal = None
 		return z
 
-	def eq( self, x, y ):
-		# we use Gaussian elimination to determine whether x - y is a relation
-		# we work with saturated monoids here, so we can do Gaussian elimination
-		# in the associated rational vector space
-		# the relations are already known to be in row echelon form
+	def normalform( self, x ):
+		# the normal form of x is the pair of its projection, as a sorted
+		# tuple of pairs ( position of generator, coefficient ), and a positive
+		# denominator, in lowest terms; equal elements have the same normal
+		# form, which is cached on the element
+		P = self.projection()
+		if x._normal is not None and x._normal[0] is P:
+			return x._normal[1]
+
+		image = self.project( x )
+		d = abs( x.denom )
+		for v in image.values(): d = math.gcd(d,v)
+		if x.denom < 0: d = -d
+		index = self.genindex()
+		form = ( tuple( sorted( ( index[k], v // d ) for k, v in image.items() ) ), 
+					x.denom // d )
+		x._normal = ( P, form )
+		return form
 
-		z = x - y
-		z.scalereduce()
-		return not any(z.coeffs.values())
+	def eq( self, x, y ):
+		# we work with saturated monoids here, so x and y are equal if and
+		# only if their projections are
+		return x is y or self.normalform( x ) == self.normalform( y )
+
+	def intern( self, x ):
+		# returns the element equal to x which was interned first, so that
+		# repeated elements such as edge lengths are stored once; interned
+		# elements must not be modified in place
+		P = self.projection()
+		table = self._interned
+		if table is None or table[0] is not P:
+			table = ( P, { } )
+			self._interned = table
+		return table[1].setdefault( self.normalform( x ), x )
+
+	def getdual( M ):
+		# the dual is computed again once generators or relations are added
+		if M.dual is None or M.dual.shape[1] != len( M.gens ):
+			M.compute_dual()
+		return M.dual
 
 	def isgeqzero( M, x ):
-		return all( [ F(x) >= 0 for F in M.dual ] )
+		return bool( M.todense( [ x ] ).isgeqzero()[0] )
 
 	def matrix_vector_mult( M, A, x ):
 		return sum( ( x[z] * A[z] for z in x.coeffs ), M.zero() )
 
+class DenseElements( object ):
+	# an array of elements of a monoid, stored as the rows of a dense integer
+	# matrix over a shared denominator; column i is the coefficient of
+	# monoid.gens[i]
+	# the coefficients are kept as int64 when they are small enough, and as
+	# python integers (dtype object) otherwise, so that they never overflow
+
+	# coefficients up to this size are kept as int64; this leaves room for one
+	# product and one sum without overflow
+	_SMALL = 2 ** 31
+
+	__slots__ = ( "monoid", "coeffs", "denom" )
+
+	def __init__( e, m, coeffs, d=1 ):
+		assert isinstance( d, int )
+		e.monoid = m
+		e.coeffs = DenseElements._fit( np.asarray( coeffs ) )
+		e.denom = d
+
+	@staticmethod
+	def _fit( a ):
+		# stores a as int64 if all of its entries are small, and as python
+		# integers otherwise
+		if a.size == 0 or int( np.abs( a ).max() ) < DenseElements._SMALL:
+			return a.astype( np.int64 )
+		return a.astype( object )
+
+	@staticmethod
+	def _matmul( a, b ):
+		# the product of the integer matrices a and b, computed in int64 when
+		# it can't overflow
+		if a.dtype == b.dtype == np.int64 and a.size and b.size:
+			bound = int( np.abs( a ).max() ) * int( np.abs( b ).max() ) * a.shape[1]
+			if bound < 2 ** 63:
+				return a.dot( b )
+		return DenseElements._fit( a.astype( object ).dot( b.astype( object ) ) )
+
+	def __len__( self ):
+		return self.coeffs.shape[0]
+
+	def __getitem__( self, i ):
+		index = self.monoid.gens
+		row = self.coeffs[i]
+		return self.monoid.Element( 
+				{ index[k] : int(row[k]) for k in np.flatnonzero( row ) }, 
+				self.denom 
+			)
+
+	def toelements( self ):
+		return [ self[i] for i in range( len(self) ) ]
+
+	def _align( self, other ):
+		# returns the coefficients of self and other over a common denominator
+		assert isinstance( other, DenseElements ) and other.monoid.gens == self.monoid.gens
+		d = self.denom * other.denom // math.gcd( self.denom, other.denom )
+		x, y = self.coeffs.astype( object ), other.coeffs.astype( object )
+		return x * ( d // self.denom ), y * ( d // other.denom ), d
+
+	def __add__( self, other ):
+		x, y, d = self._align( other )
+		return DenseElements( self.monoid, x + y, d )
+
+	def __sub__( self, other ):
+		x, y, d = self._align( other )
+		return DenseElements( self.monoid, x - y, d )
+
+	def __neg__( self ):
+		return DenseElements( self.monoid, -self.coeffs.astype( object ), self.denom )
+
+	def scale( self, n ):
+		# multiplies every element by the integer n, or the i-th element by
+		# n[i] if n is an array
+		n = np.asarray( n, dtype=object )
+		if n.ndim == 1:
+			n = n[:, None]
+		return DenseElements( self.monoid, self.coeffs.astype( object ) * n, self.denom )
+
+	def __rmul__( self, n ):
+		return self.scale( n )
+
+	def combine( self, weights ):
+		# returns the elements sum_j weights[i][j] * self[j], for each row i of
+		# the integer matrix weights
+		weights = np.asarray( weights, dtype=object )
+		return DenseElements( self.monoid, weights.dot( self.coeffs.astype( object ) ), self.denom )
+
+	def iszero( self ):
+		# returns a boolean array telling which elements are zero modulo the
+		# relations, by projecting all of them at once
+		return ~ DenseElements._matmul( self.coeffs, self.monoid.denseprojection() ).any( axis=1 )
+
+	def isgeqzero( self ):
+		# returns a boolean array telling which elements are nonnegative
+		values = DenseElements._matmul( self.coeffs, self.monoid.getdual().T )
+		if self.denom < 0:
+			values = -values
+		return ( values >= 0 ).all( axis=1 )
+
+	def eq( self, other ):
+		# returns a boolean array comparing the elements of self and other
+		return ( self - other ).iszero()
+
 class MonoidHomomorphism( object ):
 	def __init__( F, domain, codomain, matrix ):
 		assert isinstance( domain, Monoid )
 		assert isinstance( codomain, Monoid )
 		assert isinstance( matrix, dict )
 		assert set( matrix.keys() ) == set( domain.gens )
-		assert all( ( isinstance( matrix[x], codomain.Element ) 
+		assert all( ( isinstance( matrix[x], MonoidElement ) 
 						for x in domain.gens ) )
 		assert all( ( codomain.isgeqzero( matrix[x] )
 						for x in domain.gens ) )
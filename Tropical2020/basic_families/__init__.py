@@ -2,5 +2,6 @@ from .Vertex import *
 from .Leg import *
 from .Edge import *
 from .BasicFamily import *
+from .CompactCurve import *
 from .PiecewiseLinearFunction import *
 from .RPC import *
@@ -0,0 +1,186 @@
+import numpy as np
+
+from ..basic_families.AutomorphismGroup import AutomorphismGroup
+
+
+class SparseMatrix(object):
+    """
+    An integer matrix in coordinate format: the entry in row ``rows[k]`` and column ``cols[k]`` is ``values[k]``, and
+    all other entries are zero. Each position appears at most once.
+
+    ``(values, (rows, cols))`` is accepted by ``scipy.sparse.coo_matrix`` along with ``shape``.
+
+    Attributes
+    ----------
+    shape : tuple
+        the numbers of rows and columns
+    rows : numpy.ndarray
+        the row of each nonzero entry
+    cols : numpy.ndarray
+        the column of each nonzero entry
+    values : numpy.ndarray
+        the value of each nonzero entry
+    """
+
+    def __init__(self, shape: tuple, entries: dict):
+        """
+        Parameters
+        ----------
+        shape : tuple
+            the numbers of rows and columns
+        entries : dict
+            maps pairs ``(row, col)`` to values. Zero values are dropped.
+        """
+
+        entries = {position: value for position, value in entries.items() if value != 0}
+        self.shape = shape
+        self.rows = np.fromiter((r for r, _ in entries), dtype=np.int64, count=len(entries))
+        self.cols = np.fromiter((c for _, c in entries), dtype=np.int64, count=len(entries))
+        self.values = np.fromiter(entries.values(), dtype=np.int64, count=len(entries))
+
+    def __len__(self):
+        return len(self.values)
+
+    def toDense(self):
+        dense = np.zeros(self.shape, dtype=np.int64)
+        dense[self.rows, self.cols] = self.values
+        return dense
+
+    def rank(self, prime: int):
+        """
+        Returns the rank of the matrix over the integers modulo prime, by sparse Gaussian elimination. Over the
+        rationals, the rank is at least this, and equal to it unless prime divides all of the maximal nonzero minors.
+        """
+
+        rowDicts = [{} for _ in range(self.shape[0])]
+        for r, c, value in zip(self.rows.tolist(), self.cols.tolist(), self.values.tolist()):
+            rowDicts[r][c] = value % prime
+
+        # pivots[c] is a reduced row whose first nonzero entry is a 1 in column c. Sparse rows are reduced first, to
+        # limit fill-in.
+        pivots = {}
+        for row in sorted((row for row in rowDicts if row), key=len):
+            row = {c: value for c, value in row.items() if value}
+            while row:
+                c = min(row)
+                pivot = pivots.get(c)
+                if pivot is None:
+                    inverse = pow(row[c], prime - 2, prime)
+                    pivots[c] = {d: value * inverse % prime for d, value in row.items()}
+                    break
+
+                factor = row[c]
+                for d, value in pivot.items():
+                    newValue = (row.get(d, 0) - factor * value) % prime
+                    if newValue:
+                        row[d] = newValue
+                    else:
+                        row.pop(d, None)
+
+        return len(pivots)
+
+
+class CellularChainComplex(object):
+    """
+    The rational cellular chain complex of the link of the cone point of a tropical moduli space.
+
+    The stratum of a curve ``G`` with ``p + 1`` edges gives a cell of dimension ``p``. A chain is a combination of
+    pairs ``(G, w)``, where ``w`` is an ordering of the edges of ``G``, subject to ``(G, w') = sign(s) (G, w)`` when
+    ``w'`` is ``w`` permuted by ``s``. Cells of curves with an automorphism inducing an odd permutation of the edges are
+    therefore zero, and the others contribute one generator each, oriented by the order of the edges of the stratum.
+    The boundary of ``(G, e_0, ..., e_p)`` is the sum of ``(-1)^i (G/e_i, e_0, ..., e_p without e_i)``.
+
+    Attributes
+    ----------
+    space : :class:`~Tropical2020.general_families.ModuliSpace.TropicalModuliSpace`
+        the moduli space
+    prime : int
+        the prime modulo which ranks are computed
+    cells : list
+        ``cells[p]`` is the list of IDs of the strata giving the nonzero cells of dimension ``p``
+    """
+
+    def __init__(self, space, prime: int = 2147483647):
+        """
+        Parameters
+        ----------
+        space : :class:`~Tropical2020.general_families.ModuliSpace.TropicalModuliSpace`
+            a generated moduli space, with or without contraction information
+        prime : int, optional
+            the prime modulo which ranks are computed. It should be large, so that ranks agree with the rational ones.
+        """
+
+        self.space = space
+        self.prime = prime
+
+        self.cells = []
+        for i, group in enumerate(space.getAutomorphismGroups()):
+            p = space.strata[i].numEdges - 1
+            if p >= 0 and not group.reversesOrientation():
+                while len(self.cells) <= p:
+                    self.cells.append([])
+                self.cells[p].append(i)
+
+        # _cellIndex[i] is the position of stratum i in its list of cells
+        self._cellIndex = {i: k for cellsOfDimension in self.cells for k, i in enumerate(cellsOfDimension)}
+
+        self._boundaryMatrices = {}
+        self._ranks = {}
+
+    @property
+    def dimension(self):
+        return len(self.cells) - 1
+
+    # Returns the IDs of the contractions of the edges of stratum i, in order of the edges
+    def _getContractionTargets(self, i: int):
+        return [j for (_, j) in self.space.getContractions(i)]
+
+    def getBoundaryMatrix(self, p: int):
+        """
+        Returns the matrix of the boundary map from the cells of dimension ``p`` to the cells of dimension ``p - 1``,
+        as a :class:`SparseMatrix` whose columns are ``cells[p]`` and rows are ``cells[p - 1]``.
+        """
+
+        if p not in self._boundaryMatrices:
+            sources = self.cells[p] if 0 <= p < len(self.cells) else []
+            targets = self.cells[p - 1] if 0 <= p - 1 < len(self.cells) else []
+
+            entries = {}
+            for col, i in enumerate(sources):
+                stratum = self.space.strata[i]
+                for k, j in enumerate(self._getContractionTargets(i)):
+                    row = self._cellIndex.get(j)
+                    if row is None:
+                        continue
+
+                    # The contraction keeps the order of the remaining edges, and the isomorphism to the stratum
+                    # permutes them by edgeMap. The sign does not depend on the isomorphism, since the stratum has no
+                    # automorphism inducing an odd permutation.
+                    _, _, edgeMap = stratum.getContraction(k).canonicalize()
+                    sign = (-1) ** k * AutomorphismGroup.permutationSign(edgeMap)
+                    entries[(row, col)] = entries.get((row, col), 0) + sign
+
+            self._boundaryMatrices[p] = SparseMatrix((len(targets), len(sources)), entries)
+
+        return self._boundaryMatrices[p]
+
+    # Returns the rank of the boundary map from the cells of dimension p
+    def getRank(self, p: int):
+        if p not in self._ranks:
+            self._ranks[p] = self.getBoundaryMatrix(p).rank(self.prime)
+        return self._ranks[p]
+
+    def getBettiNumbers(self, reduced: bool = False):
+        """
+        Returns the list of rational Betti numbers of the link, by dimension.
+
+        Parameters
+        ----------
+        reduced : bool, optional
+            whether to return the Betti numbers of reduced homology
+        """
+
+        betti = [len(self.cells[p]) - self.getRank(p) - self.getRank(p + 1) for p in range(len(self.cells))]
+        if reduced and betti and self.cells[0]:
+            betti[0] -= 1
+        return betti
@@ -1,3 +1,4 @@
+from ..basic_families.CompactCurve import CompactCurve
 from ..basic_families.PiecewiseLinearFunction import *
 
 
@@ -18,6 +19,94 @@ class Family(object):
         self.basicFamilies = basicFamilies
         self.morphisms = morphisms
 
+    @staticmethod
+    def fromMaximalStrata(curves):
+        """
+        Builds the family generated by the given curves under edge contractions.
+
+        Starting from the given curves, every contraction of every edge of a curve of the family is added to the
+        family, up to isomorphism, until no new curves are found. Each contraction is recorded as a
+        :class:`~Tropical2020.basic_families.BasicFamily.BasicFamilyMorphism`.
+
+        The basic families of the family are built by
+        :func:`~Tropical2020.basic_families.CompactCurve.CompactCurve.toBasicFamily` from the canonical forms of the
+        curves, so each of their edges has its own generator of a free monoid as its length.
+
+        Parameters
+        ----------
+        curves : iterable
+            basic families or compact curves
+
+        Returns
+        -------
+        :class:`Family`
+            the family of the curves and all of their contractions
+        """
+
+        members = _FamilyMembers()
+        worklist = [members.add(curve) for curve in curves]
+        morphisms = set()
+
+        while worklist:
+            i = worklist.pop()
+            stratum = members.strata[i]
+
+            for k in range(stratum.numEdges):
+                j, isNew = members.addContraction(i, k)
+                if isNew:
+                    worklist.append(j)
+                morphisms.add(members.getContractionMorphism(i, k, j))
+
+        return Family(set(members.basicFamilies), morphisms)
+
+    @staticmethod
+    def fromMinimalStrata(curves, maxEdges=None):
+        """
+        Builds the family generated by the given curves under specializations.
+
+        Starting from the given curves, every specialization of a curve of the family, by splitting a vertex or
+        reducing its genus as in :func:`~Tropical2020.basic_families.CompactCurve.CompactCurve.getSpecializations`, is
+        added to the family up to isomorphism, until no new curves are found. Then every contraction of an edge of a
+        curve of the family which is again in the family is recorded as a
+        :class:`~Tropical2020.basic_families.BasicFamily.BasicFamilyMorphism`.
+
+        The basic families of the family are built as in :func:`~fromMaximalStrata`.
+
+        Parameters
+        ----------
+        curves : iterable
+            basic families or compact curves
+        maxEdges : int, optional
+            if given, curves with this many edges are not specialized further
+
+        Returns
+        -------
+        :class:`Family`
+            the family of the curves and their specializations
+        """
+
+        members = _FamilyMembers()
+        worklist = [members.add(curve) for curve in curves]
+
+        while worklist:
+            stratum = members.strata[worklist.pop()]
+            if maxEdges is not None and stratum.numEdges >= maxEdges:
+                continue
+
+            for c in stratum.getSpecializations():
+                j, isNew = members.addCanonical(c.canonical())
+                if isNew:
+                    worklist.append(j)
+
+        morphisms = set()
+        for i, stratum in enumerate(members.strata):
+            for k in range(stratum.numEdges):
+                j = members.getId(stratum.getContraction(k).canonical())
+                if j is not None:
+                    morphisms.add(members.getContractionMorphism(i, k, j))
+
+        return Family(set(members.basicFamilies), morphisms)
+
     # Returns the set of ancestors of the given basic family
     def getAncestors(self, basicFamily):
 
@@ -60,3 +149,87 @@ class Family(object):
             return True
 
         return filter(isMaximal, self.basicFamilies)
+
+
+# The curves of a family being generated, indexed in order of discovery. Curves are deduplicated by their canonical
+# compact curves, and each curve is materialized once as a basic family whose vertices and edges are listed in the
+# order of the vertices and edges of its canonical compact curve.
+class _FamilyMembers(object):
+    def __init__(self):
+        self.strata = []
+        self.basicFamilies = []
+        self._vertices = []
+        self._edges = []
+        self._ids = {}
+
+    # Adds the given basic family or compact curve if it is new, and returns its ID
+    def add(self, curve):
+        return self.addCanonical(self._toCompact(curve).canonical())[0]
+
+    @staticmethod
+    def _toCompact(curve):
+        return CompactCurve.fromBasicFamily(curve) if isinstance(curve, BasicFamily) else curve
+
+    # Adds the given canonical compact curve if it is new. Returns its ID, and whether it is new.
+    def addCanonical(self, stratum):
+        i = self._ids.get(stratum)
+        if i is not None:
+            return i, False
+
+        i = len(self.strata)
+        basicFamily, vertices, edges = stratum.toBasicFamily("Curve " + str(i), returnOrders=True)
+        self._ids[stratum] = i
+        self.strata.append(stratum)
+        self.basicFamilies.append(basicFamily)
+        self._vertices.append(vertices)
+        self._edges.append(edges)
+        return i, True
+
+    # Returns the ID of the given canonical compact curve, or None if it is not a member
+    def getId(self, stratum):
+        return self._ids.get(stratum)
+
+    # Adds the contraction of edge k of curve i if it is new. Returns its ID, and whether it is new.
+    def addContraction(self, i: int, k: int):
+        return self.addCanonical(self.strata[i].getContraction(k).canonical())
+
+    # Returns the morphism from curve i to curve j contracting edge k of curve i, where j is the contraction
+    def getContractionMorphism(self, i: int, k: int, j: int):
+        stratum = self.strata[i]
+        domain, codomain = self.basicFamilies[i], self.basicFamilies[j]
+        vertices, edges = self._vertices[i], self._edges[i]
+        targetVertices, targetEdges = self._vertices[j], self._edges[j]
+
+        # The contraction merges the second endpoint of edge k into the first, and shifts the later vertices down.
+        # Its isomorphism to curve j is given by canonicalize.
+        a, b = stratum.edgeVert1[k], stratum.edgeVert2[k]
+        _, vertexMap, edgeMap = stratum.getContraction(k).canonicalize()
+
+        def move(u):
+            if a != b:
+                if u == b:
+                    u = a
+                if u > b:
+                    u -= 1
+            return vertexMap[u]
+
+        curveMorphismDict = {v: targetVertices[move(u)] for u, v in enumerate(vertices)}
+        generatorImages = {}
+        for m, e in enumerate(edges):
+            if m == k:
+                curveMorphismDict[e] = targetVertices[move(a)]
+                generatorImages["e" + str(m)] = codomain.monoid.zero()
+            else:
+                image = targetEdges[edgeMap[m if m < k else m - 1]]
+                curveMorphismDict[e] = image
+                generatorImages["e" + str(m)] = image.length
+
+        # Legs are not distinguished, so the legs at each vertex are sent to the legs at its image in any order
+        targetLegs = {}
+        for l in codomain.legs:
+            targetLegs.setdefault(l.root, []).append(l)
+        for l in domain.legs:
+            curveMorphismDict[l] = targetLegs[curveMorphismDict[l.root]].pop()
+
+        return BasicFamilyMorphism(domain, codomain, curveMorphismDict,
+                                   MonoidHomomorphism(domain.monoid, codomain.monoid, generatorImages))
@@ -0,0 +1,121 @@
+from ..basic_families.BasicFamily import *
+
+
+class IsotypeIndex(object):
+    """
+    A collection of pairwise non-isomorphic curves, bucketed by an isomorphism invariant.
+
+    Looking up a curve only runs isomorphism tests against the curves in its bucket. With the default key, the
+    canonical certificate, buckets hold at most one curve.
+
+    Attributes
+    ----------
+    numLookups : int
+        the number of calls to :func:`~find`
+    numIsomorphismTests : int
+        the number of isomorphism tests run by :func:`~find`
+    """
+
+    def __init__(self, key=None):
+        """
+        Parameters
+        ----------
+        key : callable, optional
+            a function sending a curve to a hashable isomorphism invariant. Defaults to :func:`~certificateKey`.
+        """
+
+        self._key = IsotypeIndex.certificateKey if key is None else key
+
+        # _buckets[k] is the list of stored curves with key k
+        self._buckets = {}
+        self._size = 0
+
+        self.numLookups = 0
+        self.numIsomorphismTests = 0
+
+    @staticmethod
+    def certificateKey(curve):
+        """
+        Keys a curve by its canonical certificate. Isomorphic curves, and only isomorphic curves, share a key.
+        """
+
+        return curve.canonicalCertificate
+
+    @staticmethod
+    def invariantKey(curve):
+        """
+        Keys a curve by its number of edges and the sorted characteristics of its vertices, each paired with the
+        sorted characteristics of its neighbors. This is cheaper than :func:`~certificateKey` but can collide.
+        """
+
+        characteristics = {v: curve.getVertexCharacteristic(v) for v in curve.vertices}
+        return curve.numEdges, tuple(sorted(
+            (characteristics[v], tuple(sorted(characteristics[u] for u in curve.getNeighbors(v))))
+            for v in curve.vertices
+        ))
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for bucket in self._buckets.values():
+            yield from bucket
+
+    def __contains__(self, curve):
+        return self.find(curve) is not None
+
+    # Returns the stored curve isomorphic to the given curve, or None if there is no such curve
+    def find(self, curve):
+        self.numLookups += 1
+        for c in self._buckets.get(self._key(curve), []):
+            self.numIsomorphismTests += 1
+            if c.isIsomorphicTo(curve):
+                return c
+        return None
+
+    # Stores the given curve if it is not already present up to isomorphism.
+    # Returns the stored representative of the isotype of the curve, and whether the curve was added.
+    def add(self, curve):
+        key = self._key(curve)
+        bucket = self._buckets.setdefault(key, [])
+
+        self.numLookups += 1
+        for c in bucket:
+            self.numIsomorphismTests += 1
+            if c.isIsomorphicTo(curve):
+                return c, False
+
+        bucket.append(curve)
+        self._size += 1
+        return curve, True
+
+    def clear(self):
+        self._buckets = {}
+        self._size = 0
+
+    def bucketSizeCounts(self):
+        """
+        Returns a dictionary whose keys are bucket sizes, and whose value at ``k`` is the number of buckets of size
+        ``k``.
+        """
+
+        sizeCounts = {}
+        for bucket in self._buckets.values():
+            sizeCounts[len(bucket)] = sizeCounts.get(len(bucket), 0) + 1
+        return sizeCounts
+
+    def statistics(self):
+        """
+        Returns a dictionary summarizing the bucket sizes and the lookup work done so far.
+        """
+
+        numBuckets = len(self._buckets)
+        return {
+            "curves": self._size,
+            "buckets": numBuckets,
+            "maxBucketSize": max((len(b) for b in self._buckets.values()), default=0),
+            "meanBucketSize": self._size / numBuckets if numBuckets else 0.0,
+            "bucketSizeCounts": self.bucketSizeCounts(),
+            "lookups": self.numLookups,
+            "isomorphismTests": self.numIsomorphismTests,
+        }
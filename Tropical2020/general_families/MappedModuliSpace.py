@@ -0,0 +1,198 @@
+import collections
+import collections.abc
+import mmap
+
+from ..basic_families.BasicFamily import *
+from ..basic_families.CompactCurve import CompactCurve
+from .IsotypeIndex import IsotypeIndex
+from .ModuliSpace import TropicalModuliSpace
+from .ModuliSpaceFile import ModuliSpaceFile
+
+
+# A read-only sequence whose i-th element is computed by getItem(i) when it is accessed
+class _LazySequence(collections.abc.Sequence):
+    def __init__(self, length, getItem):
+        self._length = length
+        self._getItem = getItem
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._getItem(j) for j in range(*i.indices(self._length))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("Index out of range.")
+        return self._getItem(i)
+
+
+# A read-only view of the contraction dictionary of a MappedModuliSpace. See MappedModuliSpace.contractionDict.
+class _LazyContractionDict(collections.abc.Mapping):
+    def __init__(self, space):
+        self._space = space
+
+    def __len__(self):
+        return len(self._space.strata)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._space.getCurve(i)
+
+    def __getitem__(self, curve):
+        i = self._space.getStratumId(curve)
+        if i is None:
+            raise KeyError(curve)
+
+        # Match the edges of curve with the edges of the stratum through the canonical form of curve, so that the
+        # given curve does not need to be the cached basic family of the stratum
+        compactCurve, _, edges = CompactCurve.fromBasicFamily(curve, returnOrders=True)
+        _, _, edgeMap = compactCurve.canonicalize()
+        contractions = dict(self._space.getContractions(i))
+        return [(e, self._space.getCurve(contractions[edgeMap[k]])) for k, e in enumerate(edges)]
+
+
+class MappedModuliSpace(TropicalModuliSpace):
+    """
+    A read-only view of a moduli space saved by
+    :func:`~Tropical2020.general_families.ModuliSpace.TropicalModuliSpace.saveModuliSpaceToBinaryFile`.
+
+    The file is memory mapped, and curves are only decoded when they are accessed. Recently decoded curves are kept in
+    a least recently used cache. Processes opening the same file share its pages through the page cache, and a view
+    can be passed to another process, which maps the file again.
+
+    ``curves``, ``strata`` and the values of ``curvesDict`` are read-only sequences which decode their elements on
+    access. ``contractionDict`` maps each curve of the space (up to isomorphism) to its contraction information.
+    Looking up a curve in the space, by :func:`~getStratumId`, ``contractionDict`` or ``containsUpToIsomorphism``,
+    decodes all strata once to index them.
+    """
+
+    def __init__(self, filename, cacheSize=1024):
+        """
+        Parameters
+        ----------
+        filename : str
+            a file written by
+            :func:`~Tropical2020.general_families.ModuliSpace.TropicalModuliSpace.saveModuliSpaceToBinaryFile`
+        cacheSize : int, optional
+            the number of decoded curves to keep
+        """
+
+        self._filename = filename
+        self._cacheSize = cacheSize
+
+        with open(filename, mode='rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._savedSpace = ModuliSpaceFile(self._mmap)
+
+        self._g = self._savedSpace.g
+        self._n = self._savedSpace.n
+        self._isotypeKey = None
+
+        # Decoded strata, and basic families with their edges in the order of the edges of the strata, by ID
+        self._strataCache = collections.OrderedDict()
+        self._materializedCache = collections.OrderedDict()
+
+        numCurves = len(self._savedSpace)
+        self._strata = _LazySequence(numCurves, self.getStratum)
+        self._contractions = _LazySequence(numCurves, self._savedSpace.getContractions)
+
+        # Built on first use
+        self._isotypeIndex = None
+        self._strataIds = None
+        self._idsByNumEdges = None
+        self._contractionDict = _LazyContractionDict(self) if self._savedSpace.hasContractions else {}
+        self._DAG = None
+        self._automorphismGroups = []
+        self._automorphismGroupOrders = []
+
+    def __reduce__(self):
+        return MappedModuliSpace, (self._filename, self._cacheSize)
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    # Returns cache[i], computing it with compute(i) if it is not cached, and evicts the least recently used entries
+    def _getCached(self, cache, i, compute):
+        if i in cache:
+            cache.move_to_end(i)
+            return cache[i]
+
+        value = compute(i)
+        cache[i] = value
+        while len(cache) > self._cacheSize:
+            cache.popitem(last=False)
+        return value
+
+    # Returns the stratum with the given ID as a canonical compact curve
+    def getStratum(self, i: int):
+        return self._getCached(self._strataCache, i, self._savedSpace.getCurve)
+
+    def _materialize(self, i: int):
+        curve, _, edges = self.getStratum(i).toBasicFamily(
+            "Curve " + str(i) + " of M-" + str(self._g) + "-" + str(self._n), returnOrders=True)
+        return curve, edges
+
+    # Returns the stratum with the given ID as a basic family. While it stays in the cache, the same basic family is
+    # returned.
+    def getCurve(self, i: int):
+        return self._getCached(self._materializedCache, i, self._materialize)[0]
+
+    @property
+    def curves(self):
+        return _LazySequence(len(self._strata), self.getCurve)
+
+    @curves.setter
+    def curves(self, curves_):
+        raise TypeError("A MappedModuliSpace is read-only.")
+
+    # Curves organized by number of edges. The numbers of edges are read without decoding the curves.
+    @property
+    def curvesDict(self):
+        if self._idsByNumEdges is None:
+            self._idsByNumEdges = {}
+            for i in range(len(self._strata)):
+                self._idsByNumEdges.setdefault(self._savedSpace.getNumEdges(i), []).append(i)
+
+        return {numEdges: _LazySequence(len(ids), lambda k, ids=ids: self.getCurve(ids[k]))
+                for numEdges, ids in self._idsByNumEdges.items()}
+
+    # The numbers of edges are read without decoding the curves
+    def _getStrataNumEdges(self):
+        for i in range(len(self._savedSpace)):
+            yield self._savedSpace.getNumEdges(i)
+
+    @property
+    def isotypeIndex(self):
+        if self._isotypeIndex is None:
+            self._isotypeIndex = IsotypeIndex(self._isotypeKey)
+            self._strataIds = {}
+            for i in range(len(self._savedSpace)):
+                stratum = self._savedSpace.getCurve(i)
+                self._isotypeIndex.add(stratum)
+                self._strataIds[id(stratum)] = i
+        return self._isotypeIndex
+
+    def getStratumId(self, curve):
+        if isinstance(curve, BasicFamily):
+            curve = CompactCurve.fromBasicFamily(curve)
+        match = self.isotypeIndex.find(curve)
+        return None if match is None else self._strataIds[id(match)]
+
+    @property
+    def contractionDict(self):
+        return self._contractionDict
+
+    # The strata and contractions of the view can't change
+    def _clearStrata(self):
+        raise TypeError("A MappedModuliSpace is read-only.")
+
+    def addCurve(self, curve):
+        raise TypeError("A MappedModuliSpace is read-only.")
@@ -1,45 +1,182 @@
 from ..basic_families.BasicFamily import *
+from ..basic_families.CompactCurve import CompactCurve
+from .IsotypeIndex import IsotypeIndex
+from .ModuliSpaceFile import ModuliSpaceFile
 import re
+import os
+import bz2
+import gzip
+import lzma
+import pickle
+import time
+import multiprocessing
+from fractions import Fraction
 from ..Graphs import *
 
 
-class TropicalModuliSpace(object):
-    count = 0
+# Returns the canonical certificates of the specializations of the given curves, without repeats.
+# This is the work done by each process when generating layers in parallel.
+def _specializeSlice(curves):
+    certificates = {}
+    for curve in curves:
+        for c in curve.getSpecializations():
+            certificates[c.canonicalCertificate] = None
+    return list(certificates)
+
+
+# Returns the canonical curves isomorphic to the specializations of the given curves, encoded by
+# CompactCurve.toBytes, without repeats. The given curves are encoded the same way.
+def _specializeEncodedSlice(encodedCurves):
+    encodedSpecializations = set()
+    for encoded in encodedCurves:
+        for c in CompactCurve.fromBytes(encoded, isCanonical=True).getSpecializations():
+            encodedSpecializations.add(c.canonical().toBytes())
+    return encodedSpecializations
+
+
+# Compression formats for saved spaces, by name and by file extension
+_compressionModules = {"gzip": gzip, "bz2": bz2, "lzma": lzma}
+_compressionExtensions = {".gz": "gzip", ".bz2": "bz2", ".xz": "lzma", ".lzma": "lzma"}
+
 
-    def __init__(self, g_, n_):
+# Opens a saved space as a text file, compressed as given by compression. If compression is None, it is inferred from
+# the extension of filename, and the file is not compressed if the extension is not known.
+def _openSavedSpace(filename, mode, encoding, compression=None):
+    if compression is None:
+        compression = _compressionExtensions.get(os.path.splitext(filename)[1])
+    if compression is None:
+        return open(filename, mode=mode, encoding=encoding)
+    if compression not in _compressionModules:
+        raise ValueError("Unknown compression " + str(compression) + ". Use one of " +
+                         ", ".join(_compressionModules) + ".")
+    return _compressionModules[compression].open(filename, mode=mode + "t", encoding=encoding)
+
+
+# Returns the entry of a curve in a saved space, where contractions lists the pairs (k, j) such that contracting
+# edge k of the curve yields the curve with ID j in the file
+def _formatCurveEntry(curve, curveId, contractions):
+    edgeNames = ["edge(v" + str(a) + ", v" + str(b) + ")" for a, b in zip(curve.edgeVert1, curve.edgeVert2)]
+
+    vertexLine = "Vertices: {" + ",".join(
+        "(v" + str(v) + " with genus " + str(genus) + ")" for v, genus in enumerate(curve.genera)) + "}"
+    edgeLine = "Edges: {" + ",".join(edgeNames) + "}"
+    legLine = "Legs: {" + ",".join("leg(v" + str(r) + ")" for r in curve.legRoots) + "}"
+    idLine = "Curve ID Number: " + str(curveId)
+    contractionLine = "Contraction info: " + ", ".join(
+        "(" + edgeNames[k] + ", curve " + str(j) + ")" for (k, j) in contractions)
+    return "\n".join([vertexLine, edgeLine, legLine, idLine, contractionLine])
+
+
+class TropicalModuliSpace(object):
+    def __init__(self, g_, n_, isotypeKey=None):
         # Private copy of the genus and marking number of the space
         self._g = g_
         self._n = n_
 
-        # Holds the strata of the space
+        # Curves organized by an isomorphism invariant, for fast lookup up to isomorphism.
+        # isotypeKey is the invariant to use. See IsotypeIndex for the available choices.
+        self._isotypeKey = isotypeKey
+
+        self._clearStrata()
+
+    # Forgets all strata of the space
+    def _clearStrata(self):
+        # Holds the strata of the space as canonical compact curves. The ID of a stratum is its position in the list.
         # Should not be set externally - the strata are generated based on _g and _n
         # The strata are not generated here since this can be a time-consuming process. (Let the user choose when to
         # take the time to do so...)
-        self._curves = []
+        self._strata = []
+
+        # Index of the strata up to isomorphism, and the ID of each stratum in it (keyed by id())
+        self._isotypeIndex = IsotypeIndex(self._isotypeKey)
+        self._strataIds = {}
+
+        # Strata are only converted to basic families on demand.
+        # _materialized[i] is None or (curve, edges), where edges lists the edges of curve in the order of the
+        # edges of stratum i.
+        self._materialized = []
+
+        # _contractions[i] is None or a list of pairs (k, j), meaning that contracting edge k of stratum i yields
+        # stratum j
+        self._contractions = []
+
+        # Contractions recorded during generation, as _recordedContractions[i][k] = j. See generateSpaceDFS.
+        self._recordedContractions = {}
 
-        # Curves organized by number of edges
-        self._curvesDict = {}
+        # _automorphismGroups[i] is the automorphism group of stratum i, for the strata whose group has been computed
+        self._automorphismGroups = []
+        self._automorphismGroupOrders = []
 
-        # Dictionary tracking what each curve can contract to
-        # contractionDict[curve]: List[(edge, Int)]
-        # See the documentation for more explanation
-        self.contractionDict = {}
+        self._invalidateContractionCaches()
 
-        # Directed Acyclic Graph for storing curves
-        self.map = {}
-        self.DAG = DirectedGraph()
+    # Forgets the views of the contractions built on demand. Called whenever the strata or contractions change.
+    def _invalidateContractionCaches(self):
+        self._contractionDict = None
+        self._DAG = None
+
+    @property
+    def strata(self):
+        """
+        The strata of the space, as canonical :class:`~Tropical2020.basic_families.CompactCurve.CompactCurve` s. The
+        ID of a stratum is its position in this list.
+        """
+
+        return self._strata
 
     @property
     def curves(self):
-        return self._curves
+        return [self.getCurve(i) for i in range(len(self._strata))]
 
     @curves.setter
     def curves(self, curves_):
-        self._curves = curves_
+        self._clearStrata()
+        for curve in curves_:
+            self.addCurve(curve)
 
+    # Curves organized by number of edges
     @property
     def curvesDict(self):
-        return self._curvesDict
+        curvesDict = {}
+        for i, stratum in enumerate(self._strata):
+            curvesDict.setdefault(stratum.numEdges, []).append(self.getCurve(i))
+        return curvesDict
+
+    @property
+    def isotypeIndex(self):
+        return self._isotypeIndex
+
+    # Returns statistics about the sizes of the buckets of the isotype index, for tuning the choice of invariant
+    def isotypeIndexStatistics(self):
+        return self.isotypeIndex.statistics()
+
+    # Returns the stratum with the given ID as a basic family. The same basic family is returned on each call.
+    def getCurve(self, i: int):
+        if self._materialized[i] is None:
+            curve, _, edges = self._strata[i].toBasicFamily(
+                "Curve " + str(i) + " of M-" + str(self._g) + "-" + str(self._n), returnOrders=True)
+            self._materialized[i] = (curve, edges)
+        return self._materialized[i][0]
+
+    # Returns the ID of the stratum isomorphic to curve, or None if there is no such stratum
+    def getStratumId(self, curve):
+        if isinstance(curve, BasicFamily):
+            curve = CompactCurve.fromBasicFamily(curve)
+        match = self._isotypeIndex.find(curve)
+        return None if match is None else self._strataIds[id(match)]
+
+    # Dictionary tracking what each curve can contract to
+    # contractionDict[curve]: List[(edge, curve)]
+    # See the documentation for more explanation
+    @property
+    def contractionDict(self):
+        if self._contractionDict is None:
+            self._contractionDict = {}
+            for i, contractions in enumerate(self._contractions):
+                if contractions is not None:
+                    curve = self.getCurve(i)
+                    edges = self._materialized[i][1]
+                    self._contractionDict[curve] = [(edges[k], self.getCurve(j)) for (k, j) in contractions]
+        return self._contractionDict
 
     # Given input s of type Set[A], returns a list of all partitions of s into two subsets.
     # The return type of this function is List[(Set[A], Set[A]).
@@ -83,220 +220,605 @@ class TropicalModuliSpace(object):
         modifySelf = (curves is None)
 
         if modifySelf:
-            # The curves are organized by their number of edges in curvesDict, so we can reduce each group
-            # individually (this reduces the number of isomorphisms to check for).
-            for n in self.curvesDict:
-                self.curvesDict[n] = self.reduceByIsomorphism(self.curvesDict[n])
-
-            # Now that curvesDict has been reduced, get the correct curves in self.curves.
-            # Effectively, self.curves = union(self.curvesDict.values())
-            self.curves = set()
-            for n in self.curvesDict:
-                self.curves = list(set(self.curves | set(self.curvesDict[n])))
+            # The strata are kept reduced as they are added, so there is nothing to do
+            return
         else:
-            # Since isomorphism is an equivalence relation, we might not have to check every pair of curves for iso.
-            # Our algorithm is to iterate over the given curves and check for isomorphism with a representative of each
-            # isotype.
-            isotypes = []
+            # Bucket the curves by isotype. Only curves that share an invariant are checked for isomorphism.
+            index = IsotypeIndex(self._isotypeKey)
+            isotypes = {}
+            representatives = []
             for curve in curves:
-                # Until we check, assume that "curve" will represent a new isotype
-                newIsotype = True
-
-                # Actually perform the check
-                for t in isotypes:
-                    # If the curve isn't new, then add it to its isotype and stop checking
-                    if t[0].isIsomorphicTo(curve):
-                        t.append(curve)
-                        newIsotype = False
-                        break
-
-                # If we made it here without unsetting the newIsotype flag, then the curve represents a new isotype.
+                representative, newIsotype = index.add(curve)
                 if newIsotype:
-                    isotypes.append([curve])
+                    # The curve represents a new isotype.
+                    representatives.append(curve)
+                    isotypes[id(curve)] = [curve]
+                else:
+                    isotypes[id(representative)].append(curve)
 
             if returnReductionInformation:
-                reductionDict = {t[0]: t for t in isotypes}
-                return [t[0] for t in isotypes], reductionDict
+                reductionDict = {t: isotypes[id(t)] for t in representatives}
+                return representatives, reductionDict
             else:
-                return [t[0] for t in isotypes]
+                return representatives
 
     # Checks if curve is contained in self.curves up to isomorphism.
-    # Optionally, the user can ask for the match to be returned, if it exists.
+    # Optionally, the user can ask for the match to be returned, if it exists. The match is a basic family if curve is
+    # one, and a stratum otherwise.
     def containsUpToIsomorphism(self, curve, returnMatch=False):
+        i = self.getStratumId(curve)
+
+        match = None
+        if i is not None:
+            match = self.getCurve(i) if isinstance(curve, BasicFamily) else self._strata[i]
 
-        # We only need to compare against curves with the same number of edges
-        if curve.numEdges not in self.curvesDict:
-            if returnMatch:
-                return False, None
-            else:
-                return False
-        else:
-            # Check for isomorphism with curves of the same number of edges
-            for c in self.curvesDict[curve.numEdges]:
-                if c.isIsomorphicTo(curve):
-                    if returnMatch:
-                        return True, c
-                    else:
-                        return c
-
-        # If this code is reached, then no match was found
         if returnMatch:
-            return False, None
+            return match is not None, match
         else:
-            return False
+            return match if match is not None else False
 
-    # Adds "curve" to self.curves and self.curvesDict if it is not already present up to isomorphism. If the curve is
-    # already present, then nothing is added.
+    # Adds "curve" to the strata if it is not already present up to isomorphism. If the curve is already present, then
+    # nothing is added. The curve may be a basic family or a compact curve.
+    # Returns whether the curve was added.
     def addCurve(self, curve):
-        curveIsNew = not self.containsUpToIsomorphism(curve)
+        materialized = None
+        if isinstance(curve, BasicFamily):
+            compactCurve, _, edges = CompactCurve.fromBasicFamily(curve, returnOrders=True)
+            stratum, _, edgeMap = compactCurve.canonicalize()
+
+            # Keep the given basic family as the materialization of the stratum
+            canonicalEdges = [None] * len(edges)
+            for k, e in enumerate(edges):
+                canonicalEdges[edgeMap[k]] = e
+            materialized = (curve, canonicalEdges)
+        else:
+            stratum = curve.canonical()
 
-        if curveIsNew:
-            numEdges = curve.numEdges
+        _, curveIsNew = self._isotypeIndex.add(stratum)
 
-            # Decide whether we need to initialize or update self.curvesDict[numEdges]
-            if numEdges in self.curvesDict:
-                self.curvesDict[numEdges] = self.curvesDict[numEdges] + [curve]
-            else:
-                self.curvesDict[numEdges] = [curve]
+        if curveIsNew:
+            self._strataIds[id(stratum)] = len(self._strata)
+            self._strata.append(stratum)
+            self._materialized.append(materialized)
+            self._contractions.append(None)
+            self._invalidateContractionCaches()
 
-            # Update self.curves
-            self.curves.append(curve)
+        return curveIsNew
 
-    # Adds the specializations of curve to self.curves
+    # Adds the specializations of curve to the strata
     def addSpecializationsDFS(self, curve):
-        newCurves = []
-
-        # Get the one-step specializations of the given curve
-        for vert in curve.vertices:
-
-            # If the genus of vert is greater than 1, then we can decrement its genus and add a self loop
-            if vert.genus > 1:
-                genusReducedCurve = self.getGenusReductionSpecialization(curve, vert)
-                newCurves.append(genusReducedCurve)
-            # If the genus of vert is exactly 1, we need to make sure that stability is preserved after genus reduction
-            # This case should only occur when g=1 and we process the seed curve
-            elif vert.genus == 1 and curve.degree(vert) > 0:
-                genusReducedCurve = self.getGenusReductionSpecialization(curve, vert)
-                newCurves.append(genusReducedCurve)
-                # print("decrement genus yields")
-                # genusReducedCurve.printSelf()
-
-            # We can also split a vertex in two and pass around parts of its genus and endpoints to the new pieces
-            endpointPartitions = self.getPartitions(curve.getEndpointsOfEdges(vert))
-            #print("partitions", endpointPartitions)
-
-            # Anticipate some isomorphic results - (S, T) and (T, S) produce the same splitting specialization
-            endpointPartitions = [(S, T) for (S, T) in endpointPartitions if len(S) <= len(T)]
-
-            # Iterate over the possible genera of the split vertices
-            for g in range(vert.genus + 1):
-                for p in endpointPartitions:
-                    S, T = p
-                    # Make sure that the splitting specialization will be stable
-                    if not ((g == 0 and len(S) < 2) or (g == vert.genus and len(T) < 2)):
-                        vertexSplitCurve = self.getSplittingSpecialization(curve, vert, g, vert.genus - g, S, T)
-                        newCurves.append(vertexSplitCurve)
-                        # print("splitting genus yields")
-                        # vertexSplitCurve.printSelf()
-
-        newCurvesBuffer = self.reduceByIsomorphism(newCurves)
-        # newCurvesBuffer = newCurves
-        newCurves = []
-
-        for c in newCurvesBuffer:
-            # print("splitting genus after isomorphism yields")
-            # print(c.printSelf())
-
-            iso = self.containsUpToIsomorphism(c)
-            if iso:
-                pass
-                # print("ADDING ISOMORPHIC EDGE")
-                # self.updateDAG(curve, iso, False)
-            else:
-                # self.updateDAG(curve, c)
-                # print("splitting genus after isomorphism yields")
-                # print(c.printSelf())
-                newCurves.append(c)
-                self.addCurve(c)
-
-        # print("Found ", len(newCurves), " new curves")
-        # print("Currently have ", len(self.curves), " curves!")
-        # Specialize the specializations DFS - Moduli Spaces have a wide DAG structure (under the contraction relation)
-        for c in newCurves:
-            self.addSpecializationsDFS(c)
-
-    def updateDAG(self, source: BasicFamily, target: BasicFamily, original=True):
-        source_id = hash(tuple(sorted(source.vertexCharacteristicCounts.items()))) if source else None
-        target_id = hash(tuple(sorted(target.vertexCharacteristicCounts.items()))) if target else None
-
-        if original:
-            self.map[target_id] = self.count
-            self.count += 1
-            self.DAG.add_vertex([self.map[target_id], target])
-        if source is not None:
-            self.DAG.add_edge([self.map[source_id], self.map[target_id]])
-
-    def contraction_map(self, graph: BasicFamily):
-        id = hash(tuple(sorted(graph.vertexCharacteristicCounts.items())))
-        if id not in self.map:
-            self.map[id] = self.count
-            self.count += 1
-            self.DAG.add_vertex([self.map[id], graph])
+        if isinstance(curve, BasicFamily):
+            curve = CompactCurve.fromBasicFamily(curve)
+
+        self._specializeFrontierDFS([curve])
+
+    # Specializes the curves of the frontier depth first, until the frontier is empty. The frontier is a stack of
+    # curves whose specializations have not been added yet, and the last curve is processed first.
+    # If checkpointFile is given, then the strata and the frontier are saved to it every checkpointInterval seconds.
+    # If recordContractions is set, then the contractions undoing each specialization are recorded.
+    def _specializeFrontierDFS(self, frontier, checkpointFile=None, checkpointInterval=600.0,
+                               recordContractions=False):
+        lastCheckpoint = time.time()
+
+        while frontier:
+            curve = frontier.pop()
+            curveId = self.getStratumId(curve) if recordContractions else None
+
+            newCurves = []
+            for c in curve.getSpecializations():
+                if self.addCurve(c):
+                    newCurves.append(self._strata[-1])
+                if recordContractions:
+                    self._recordContraction(c, curveId)
+
+            # Specialize the specializations DFS - Moduli Spaces have a wide DAG structure (under the contraction
+            # relation). The first new curve is specialized first.
+            frontier.extend(reversed(newCurves))
+
+            if checkpointFile is not None and time.time() - lastCheckpoint >= checkpointInterval:
+                self.saveCheckpoint(checkpointFile, frontier)
+                lastCheckpoint = time.time()
+
+    # Records that contracting the last edge of specialization yields the stratum with ID parentId.
+    # The last edge is mapped to the matching edges of the stratum isomorphic to specialization. Every edge in its orbit
+    # has the same contraction, and the automorphisms are already known from finding the canonical form.
+    def _recordContraction(self, specialization, parentId):
+        childId = self.getStratumId(specialization)
+        recorded = self._recordedContractions.setdefault(childId, {})
+        for k in specialization.getCanonicalEdgeOrbit(specialization.numEdges - 1):
+            recorded[k] = parentId
+
+    # Turns the recorded contractions into the contraction information of the space. Contractions of edges which were
+    # not recorded are looked up.
+    def _completeRecordedContractions(self):
+        for i, stratum in enumerate(self._strata):
+            recorded = self._recordedContractions.get(i, {})
+            if len(recorded) < stratum.numEdges:
+                recorded.update(self.getContractionPairs(stratum))
+            self._contractions[i] = sorted(recorded.items())
+
+        self._recordedContractions = {}
+        self._invalidateContractionCaches()
 
     # Generates M_{g, n}. To do so, start with the unique n-marked curve of genus g without any edges, and add its
     # specializations.
-    def generateSpaceDFS(self):
+    # If checkpointFile is given, then the progress of the generation is saved to it every checkpointInterval seconds
+    # and when the generation is done. If checkpointFile already exists, then the generation resumes from it.
+    # If recordContractions is set, then each specialization is recorded as the inverse of an edge contraction, so that
+    # the contraction information is known at the end without calling generateContractionDictionary.
+    def generateSpaceDFS(self, checkpointFile=None, checkpointInterval=600.0, recordContractions=False):
+        seed = self.getSeedCurve()
 
         # Manually check to see if the space is empty.
+        if seed is None:
+            return
+
+        if checkpointFile is not None and os.path.exists(checkpointFile):
+            frontier = self.loadCheckpoint(checkpointFile)
+        else:
+            # If the space is nonempty, then all of the curves are specializations of the seed curve
+            # Let the seed grow!
+            self.addCurve(seed)
+            frontier = [seed]
+
+        self._specializeFrontierDFS(frontier, checkpointFile, checkpointInterval, recordContractions)
+
+        if checkpointFile is not None:
+            self.saveCheckpoint(checkpointFile, frontier)
+
+        if recordContractions:
+            self._completeRecordedContractions()
+
+    def saveCheckpoint(self, filename, frontier=()):
+        """
+        Saves the strata of the space and a frontier of strata whose specializations have not been added yet.
+
+        The file is replaced atomically, so an interrupted save leaves the previous checkpoint intact.
+
+        Parameters
+        ----------
+        filename : str
+            the checkpoint file
+        frontier : iterable, optional
+            strata of the space, as compact curves
+        """
+
+        checkpoint = {
+            "g": self._g,
+            "n": self._n,
+            "strata": [(c.genera, c.edgeVert1, c.edgeVert2, c.legRoots) for c in self._strata],
+            "frontier": [self.getStratumId(c) for c in frontier],
+            "recordedContractions": self._recordedContractions,
+        }
+
+        temporaryFilename = filename + ".tmp"
+        with open(temporaryFilename, mode='wb') as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryFilename, filename)
+
+    def loadCheckpoint(self, filename):
+        """
+        Replaces the strata of the space by those saved in a checkpoint.
+
+        Parameters
+        ----------
+        filename : str
+            a file written by :func:`~saveCheckpoint`
+
+        Returns
+        -------
+        list
+            the saved frontier, as strata of the space
+        """
+
+        with open(filename, mode='rb') as f:
+            checkpoint = pickle.load(f)
+
+        if (checkpoint["g"], checkpoint["n"]) != (self._g, self._n):
+            raise ValueError("The checkpoint " + filename + " is for M-" + str(checkpoint["g"]) + "-" +
+                             str(checkpoint["n"]) + ", not M-" + str(self._g) + "-" + str(self._n) + ".")
+
+        self._clearStrata()
+        for data in checkpoint["strata"]:
+            self.addCurve(CompactCurve(*data, isCanonical=True))
+        # Older checkpoints have no recorded contractions, which are then found when the generation completes
+        self._recordedContractions = checkpoint.get("recordedContractions", {})
+
+        return [self._strata[i] for i in checkpoint["frontier"]]
+
+    # Returns the canonical seed curve of the space, or None if the space is empty
+    def getSeedCurve(self):
         if self._g == 0 and self._n < 3:
+            return None
+        return CompactCurve.seed(self._g, self._n)
+
+    def generateMaximalStrata(self):
+        """
+        Returns the maximal strata of the space, without generating the rest of the space.
+
+        The maximal strata are the stable curves whose vertices all have genus 0 and degree 3. Such a curve has
+        ``2g - 2 + n`` vertices. For each way of distributing the legs among the vertices, the multigraphs with the
+        remaining degrees are enumerated by their adjacency matrices, filled in one row at a time. Vertices with the
+        same number of legs and no edges so far are interchangeable, so only one of the ways to join a vertex to them
+        is kept. The connected multigraphs are then deduplicated by canonical form.
+
+        Returns
+        -------
+        list
+            the maximal strata as canonical compact curves
+        """
+
+        seed = self.getSeedCurve()
+        numVertices = 2 * self._g - 2 + self._n
+        if seed is None or numVertices <= 0:
+            # M_{1, 0} only has its seed, and there is nothing to specialize it to
+            return [] if seed is None else [seed]
+
+        strata = {}
+        for legCounts in self._getLegDistributions(self._n, numVertices, 3):
+            for edges in self._getTrivalentEdges(legCounts):
+                curve = CompactCurve((0,) * numVertices, (a for a, _ in edges), (b for _, b in edges),
+                                     (v for v in range(numVertices) for _ in range(legCounts[v])))
+                strata[curve.canonical()] = None
+        return list(strata)
+
+    # Yields the non-increasing tuples of numVertices integers between 0 and maxLegs which sum to numLegs
+    @staticmethod
+    def _getLegDistributions(numLegs, numVertices, maxLegs):
+        if numVertices == 0:
+            if numLegs == 0:
+                yield ()
             return
+        for first in range(min(numLegs, maxLegs), -1, -1):
+            if first * numVertices >= numLegs:
+                for rest in TropicalModuliSpace._getLegDistributions(numLegs - first, numVertices - 1, first):
+                    yield (first,) + rest
 
-        # If the space is nonempty, then all of the curves are specializations of seedCurve
-        seedCurve = BasicFamily("Seed curve with genus " + str(self._g) + ", " + str(self._n) + " legs, and 0 edges")
-        v = Vertex("v", self._g)
-        seedCurve.addVertex(v)
-        seedCurve.addLegs({Leg("leg " + str(i), v) for i in range(self._n)})
-        seedCurve.monoid = Monoid()
+    # Yields the edge lists of the connected multigraphs in which vertex v has degree 3 - legCounts[v], up to
+    # permutations of vertices with the same number of legs. Each edge is a pair (a, b) with a <= b.
+    @staticmethod
+    def _getTrivalentEdges(legCounts):
+        numVertices = len(legCounts)
+        remaining = [3 - legs for legs in legCounts]
+        touched = [False] * numVertices
+        edges = []
+
+        # Union-find over the vertices, to check connectedness at the end
+        def isConnected():
+            parent = list(range(numVertices))
+
+            def find(x):
+                while parent[x] != x:
+                    parent[x] = parent[parent[x]]
+                    x = parent[x]
+                return x
+
+            for a, b in edges:
+                parent[find(a)] = find(b)
+            return len({find(v) for v in range(numVertices)}) == 1
+
+        # Distributes the remaining degree of vertex v among the vertices u >= start, where bound is the most edges
+        # allowed to u, so that untouched interchangeable vertices get non-increasing numbers of edges
+        def fillRow(v, start, bound):
+            if remaining[v] == 0:
+                yield from fillRows(v + 1)
+                return
+            if start == numVertices:
+                return
+
+            # The untouched vertices of the same class as the previous one are bounded by its number of edges
+            interchangeable = (start > v + 1 and not touched[start] and not touched[start - 1] and
+                               legCounts[start] == legCounts[start - 1])
+            maxCount = min(remaining[v], remaining[start], bound if interchangeable else remaining[v])
+            for count in range(maxCount, -1, -1):
+                if count:
+                    wasTouched = touched[start]
+                    remaining[v] -= count
+                    remaining[start] -= count
+                    touched[start] = True
+                    edges.extend([(v, start)] * count)
+                    yield from fillRow(v, start + 1, count)
+                    del edges[len(edges) - count:]
+                    touched[start] = wasTouched
+                    remaining[start] += count
+                    remaining[v] += count
+                else:
+                    yield from fillRow(v, start + 1, 0)
+
+        def fillRows(v):
+            if v == numVertices:
+                if isConnected():
+                    yield list(edges)
+                return
+
+            # The degrees of the vertices before v are used up. If none of their edges reaches a later vertex, then
+            # the graph can't be connected.
+            if v > 0 and not any(touched[v:]):
+                return
+
+            # Loops use two units of degree each
+            wasTouched = touched[v]
+            for loops in range(remaining[v] // 2, -1, -1):
+                remaining[v] -= 2 * loops
+                touched[v] = wasTouched or loops > 0
+                edges.extend([(v, v)] * loops)
+                yield from fillRow(v, v + 1, remaining[v])
+                del edges[len(edges) - loops:]
+                remaining[v] += 2 * loops
+            touched[v] = wasTouched
+
+        yield from fillRows(0)
+
+    def generateLayersBFS(self, processes=None):
+        """
+        Yields the layers of the strata of the space, in order of their number of edges.
+
+        Every one-step specialization of a curve with ``k`` edges has ``k + 1`` edges, so layer ``k + 1`` is built from
+        layer ``k`` alone and deduplicated as a whole with a fresh isotype index. Only the current layer is held in
+        memory, so this can be used to stream the strata of spaces too large to keep.
+
+        Parameters
+        ----------
+        processes : int, optional
+            if given, each layer is split into slices which are specialized by a pool of this many processes. Each
+            process returns the canonical certificates of its specializations, and these are merged here.
+
+        Yields
+        ------
+        list
+            the strata with ``k`` edges as canonical compact curves, for ``k = 0, 1, 2, ...``
+        """
+
+        seed = self.getSeedCurve()
+        layer = [] if seed is None else [seed]
+
+        pool = multiprocessing.Pool(processes) if processes is not None else None
+        try:
+            while layer:
+                yield layer
+
+                if pool is None:
+                    specializations = (c.canonical() for curve in layer for c in curve.getSpecializations())
+                else:
+                    # A few slices per process keeps the processes busy when some slices are slower than others.
+                    # The slices are contiguous so that the layers come out in the same order as without the pool.
+                    sliceSize = -(-len(layer) // (4 * processes))
+                    slices = [layer[i:i + sliceSize] for i in range(0, len(layer), sliceSize)]
+                    specializations = (CompactCurve(*certificate, isCanonical=True)
+                                       for certificates in pool.map(_specializeSlice, slices)
+                                       for certificate in certificates)
+
+                nextLayerIndex = IsotypeIndex(self._isotypeKey)
+                nextLayer = []
+                for c in specializations:
+                    if nextLayerIndex.add(c)[1]:
+                        nextLayer.append(c)
+
+                # Layer k is no longer needed once layer k + 1 is built
+                layer = nextLayer
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def countStrata(self, processes=None):
+        """
+        Counts the strata of the space by number of edges, without storing them.
+
+        The layers are built as in :func:`~generateLayersBFS`, but each layer is kept as a set of canonical curves
+        encoded as bytes by :func:`~Tropical2020.basic_families.CompactCurve.CompactCurve.toBytes`. Curves are only
+        decoded while they are specialized, and each one is discarded once its specializations are encoded. The strata
+        of the space are left unchanged.
+
+        Parameters
+        ----------
+        processes : int, optional
+            if given, each layer is split into slices which are specialized by a pool of this many processes
+
+        Returns
+        -------
+        list
+            ``counts[k]`` is the number of strata with ``k`` edges
+        """
+
+        seed = self.getSeedCurve()
+        layer = set() if seed is None else {seed.toBytes()}
+        counts = []
+
+        pool = multiprocessing.Pool(processes) if processes is not None else None
+        try:
+            while layer:
+                counts.append(len(layer))
+
+                nextLayer = set()
+                if pool is None:
+                    # Layer k is emptied as layer k + 1 is built
+                    while layer:
+                        nextLayer.update(_specializeEncodedSlice((layer.pop(),)))
+                else:
+                    layer = list(layer)
+                    sliceSize = -(-len(layer) // (4 * processes))
+                    slices = [layer[i:i + sliceSize] for i in range(0, len(layer), sliceSize)]
+                    del layer
+                    for encodedSpecializations in pool.imap_unordered(_specializeEncodedSlice, slices):
+                        nextLayer.update(encodedSpecializations)
+
+                layer = nextLayer
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        return counts
+
+    # Generates M_{g, n} one layer at a time, as described in generateLayersBFS.
+    # The strata are numbered by their number of edges. If generateContractions is set, then the contractions of each
+    # layer into the previous one are found as the layer is added, as in generateContractionDictionary.
+    # If processes is given, then the specializations of each layer are found by that many processes.
+    def generateSpaceBFS(self, generateContractions=False, processes=None):
+        for layer in self.generateLayersBFS(processes):
+            for c in layer:
+                if self.addCurve(c) and generateContractions:
+                    self._contractions[-1] = self.getContractionPairs(self._strata[-1])
+
+        if generateContractions:
+            self._invalidateContractionCaches()
+
+    def generateLayersByAugmentation(self):
+        """
+        Yields the layers of the strata of the space, in order of their number of edges, using canonical augmentation.
+
+        Each curve of a layer is only specialized once per orbit of specializations under its automorphism group, and
+        a specialization is only kept if its new edge is its canonical parent edge. This way each stratum is produced
+        by exactly one curve of the previous layer, and no lookup among the strata found so far is needed. Only the
+        specializations of the same curve are compared with each other.
+
+        Yields
+        ------
+        list
+            the strata with ``k`` edges as canonical compact curves, for ``k = 0, 1, 2, ...``
+        """
+
+        seed = self.getSeedCurve()
+        layer = [] if seed is None else [seed]
+
+        while layer:
+            yield layer
+
+            nextLayer = []
+            for curve in layer:
+                # Compact curves compare by isomorphism class, so this removes the repeated specializations of curve
+                children = {}
+                for c in curve.getAugmentations():
+                    if c.isCanonicalAugmentation():
+                        children[c.canonical()] = None
+                nextLayer.extend(children)
+
+            layer = nextLayer
+
+    # Generates M_{g, n} one layer at a time, as described in generateLayersByAugmentation
+    def generateSpaceByAugmentation(self):
+        for layer in self.generateLayersByAugmentation():
+            for c in layer:
+                self.addCurve(c)
 
-        # Let the seed grow!
-        self.addCurve(seedCurve)
-        self.updateDAG(None, seedCurve)
-        self.addSpecializationsDFS(seedCurve)
+    # Returns the list of pairs (k, j) such that contracting edge k of curve yields stratum j
+    def getContractionPairs(self, curve):
+        # Parallel edges, and edges exchanged by automorphisms of curve, have isomorphic contractions. Only the first
+        # edge of each class of getEdgeOrbits is contracted, and its contraction is found by its canonical certificate.
+        edgeOrbits = curve.getEdgeOrbits()
+        targets = {}
+
+        contractionPairs = []
+        for k in range(curve.numEdges):
+            representative = edgeOrbits[k]
+            if representative not in targets:
+                targets[representative] = self.getStratumId(curve.getContraction(representative))
+
+                # This had better be found! Remember to generate the space...
+                assert targets[representative] is not None
+            contractionPairs.append((k, targets[representative]))
+
+        return contractionPairs
+
+    # Returns the list of pairs (k, j), ordered by k, such that contracting edge k of stratum i yields stratum j. Known
+    # contractions are used when they have been generated, and the others are found by getContractionPairs.
+    def getContractions(self, i: int):
+        contractions = self._contractions[i]
+        if contractions is None:
+            return self.getContractionPairs(self._strata[i])
+        return sorted(contractions)
+
+    def getAutomorphismGroups(self):
+        """
+        Returns the list of the automorphism groups of the strata, as
+        :class:`~Tropical2020.basic_families.AutomorphismGroup.AutomorphismGroup` objects indexed by stratum ID.
+
+        The groups are computed from the compact strata, without building basic families, and are kept for later calls.
+        Only the groups of strata added since the last call are computed.
+        """
+
+        for stratum in self._strata[len(self._automorphismGroups):]:
+            self._automorphismGroups.append(stratum.automorphismGroup())
+        return self._automorphismGroups
+
+    def getAutomorphismGroupOrders(self):
+        """
+        Returns the list of the orders of the automorphism groups of the strata, indexed by stratum ID.
+
+        Only the orders are kept, so on a :class:`~Tropical2020.general_families.MappedModuliSpace.MappedModuliSpace`
+        no automorphism groups are stored. Only the orders of strata added since the last call are computed.
+        """
+
+        for stratum in self._strata[len(self._automorphismGroupOrders):]:
+            self._automorphismGroupOrders.append(stratum.getAutomorphismGroupOrder())
+        return self._automorphismGroupOrders
+
+    # Yields the number of edges of each stratum, in order of ID
+    def _getStrataNumEdges(self):
+        for stratum in self._strata:
+            yield stratum.numEdges
+
+    def getFVector(self, weighted=False):
+        """
+        Returns the f-vector of the space: the number of strata with each number of edges, which is the dimension of
+        their cones.
+
+        Parameters
+        ----------
+        weighted : bool, optional
+            whether to count each stratum with weight ``1 / |Aut(G)|``, where ``G`` is the stratum and its
+            automorphisms may permute the legs at each vertex. See :func:`~getAutomorphismGroupOrders`.
+
+        Returns
+        -------
+        list
+            ``f[k]`` is the number of strata with ``k`` edges. If ``weighted`` is set, then it is their total weight,
+            as a ``Fraction``.
+        """
+
+        numEdges = list(self._getStrataNumEdges())
+        if weighted:
+            weights = [Fraction(1, order) for order in self.getAutomorphismGroupOrders()]
+        else:
+            weights = [1] * len(numEdges)
 
-    # For each curve in the space, and each edge of the curve, identify what curve in the space is isomorphic to the
-    # contraction by that edge.
-    def generateContractionDictionary(self):
-        # At this point, the strata should have been generated, so we can nicely print out progress
-        numCurves = len(self.curves)
-        it = 1
+        f = [0] * (max(numEdges, default=-1) + 1)
+        for k, weight in zip(numEdges, weights):
+            f[k] += weight
+        return f
 
-        # Find contraction info of every curve
-        for curve in self.curves:
-            # print("Working on getting contraction history of curve", str(it) + "/" + str(numCurves),
-            #       "of M-" + str(self._g) + "-" + str(self._n))
+    def getOrbifoldEulerCharacteristic(self):
+        """
+        Returns the orbifold Euler characteristic of the space, the sum of ``(-1)^|E(G)| / |Aut(G)|`` over its strata
+        ``G``, as a ``Fraction``. Since legs are not distinguished, this is the orbifold Euler characteristic of the
+        space with marked legs divided by ``n!``.
 
-            # curve.printSelf()
-            # Find each contraction pair (curve/{e}, e)
-            # print(curve.vertexCharacteristicCounts)
-            contractionPairs = []
-            for nextEdge in curve.edges:
-                contractionCurve = curve.getContraction(nextEdge)
+        The stratum without edges contributes ``1 / n!``. The orbifold Euler characteristic of the link of the cone
+        point, whose cells are the strata with at least one edge in one dimension lower, is ``1 - chi``.
+        """
 
-                # Find curve/{e} up to isomorphism
-                p = self.containsUpToIsomorphism(contractionCurve, returnMatch=True)
-                containsAMatch = p[0]
-                match = p[1]
+        return sum(((-1) ** k * weight for k, weight in enumerate(self.getFVector(weighted=True))), Fraction(0))
 
-                # This had better be true! Remember to generate the space...
-                assert containsAMatch
-                contractionPairs.append((nextEdge, match))
+    # Directed Acyclic Graph of the contraction relation, built from the known contractions on first access.
+    # Vertex i is the stratum with ID i, and there is an edge from i to j for each edge of stratum i whose contraction
+    # is stratum j.
+    @property
+    def DAG(self):
+        if self._DAG is None:
+            self._DAG = DirectedGraph()
+            for i, stratum in enumerate(self._strata):
+                self._DAG.add_vertex([i, stratum])
+            for i, contractions in enumerate(self._contractions):
+                for (_, j) in contractions or ():
+                    self._DAG.add_edge([i, j])
+        return self._DAG
 
-                self.contraction_map(curve)
-                self.contraction_map(match)
-                self.updateDAG(curve, match, False)
+    # For each curve in the space, and each edge of the curve, identify what curve in the space is isomorphic to the
+    # contraction by that edge.
+    def generateContractionDictionary(self):
+        for i, stratum in enumerate(self._strata):
+            self._contractions[i] = self.getContractionPairs(stratum)
 
-            self.contractionDict[curve] = contractionPairs
-            it += 1
+        self._invalidateContractionCaches()
 
     # Specializes 'curve' at 'vert' as determined by g1, g2, S, and T
     # Specifically, 'vert' is split into two vertices, v1 and v2, of genuses g1 and g2 respectively,
@@ -311,23 +833,11 @@ class TropicalModuliSpace(object):
 
         for p in S:
             e, edgeNum = p
-            if isinstance(e, Edge):
-                if edgeNum == 1:
-                    e.vert1 = v1
-                else:
-                    e.vert2 = v1
-            else:
-                e.root = v1
+            curve.moveEndpoint(e, edgeNum, v1)
 
         for p in T:
             e, edgeNum = p
-            if isinstance(e, Edge):
-                if edgeNum == 1:
-                    e.vert1 = v2
-                else:
-                    e.vert2 = v2
-            else:
-                e.root = v2
+            curve.moveEndpoint(e, edgeNum, v2)
 
         curve.monoid.addgen("(Edge splitting " + vert.name + ")")
         newLength = curve.monoid.Element({"(Edge splitting " + vert.name + ")": 1})
@@ -362,13 +872,7 @@ class TropicalModuliSpace(object):
 
         for p in endpoints:
             e, edgeNum = p
-            if isinstance(e, Edge):
-                if edgeNum == 1:
-                    e.vert1 = v
-                else:
-                    e.vert2 = v
-            else:
-                e.root = v
+            curve.moveEndpoint(e, edgeNum, v)
 
         curve.monoid.addgen("(Genus reduction loop for " + vert.name + ")")
         newLength = curve.monoid.Element({"(Genus reduction loop for " + vert.name + ")": 1})
@@ -384,92 +888,63 @@ class TropicalModuliSpace(object):
         self.specializeByReducingGenus(c, copyInfo[vert])
         return c
 
-    def loadModuliSpaceFromFile(self, filename, curveEntryDelimiter="=", encoding='utf-8'):
-        self.curves = set()
-        with open(filename, mode='r', encoding=encoding) as f:
+    # Loads a space saved by saveModuliSpaceToFile. Compressed files are read as in saveModuliSpaceToFile.
+    def loadModuliSpaceFromFile(self, filename, curveEntryDelimiter="=", encoding='utf-8', compression=None):
+        self._clearStrata()
+
+        vertexInfoFinder = re.compile(r"\((v\d*) with genus (\d*)\)")
+        edgeInfoFinder = re.compile(r"edge\((v\d*), (v\d*)\)")
+        legInfoFinder = re.compile(r"leg\((v\d*)\)")
+        curveIdInfoFinder = re.compile(r"Curve ID Number: (\d*)$")
+        contractionInfoFinder = re.compile(r"\(edge\((v\d*), (v\d*)\), curve (\d*)\)")
+
+        with _openSavedSpace(filename, 'r', encoding, compression) as f:
             content = f.read()
-            curveStrings = content.split("\n" + curveEntryDelimiter + "\n")
-            curveIdDictionary = {}
-            curveContractionDictionary = {}
-            for curveString in curveStrings:
-                curveInfo = curveString.split("\n")
-                vertexInfo = curveInfo[0]
-                vertexInfoFinder = re.compile("\((v\d*) with genus (\d*)\)")
-
-                edgeInfo = curveInfo[1]
-                edgeInfoFinder = re.compile("edge\((v\d*), (v\d*)\)")
-
-                legInfo = curveInfo[2]
-                legInfoFinder = re.compile("leg\((v\d*)\)")
-
-                curveIdInfo = curveInfo[3]
-                curveIdInfoFinder = re.compile("Curve ID Number: (\d*)$")
-
-                contractionInfo = curveInfo[4]
-                contractionInfoFinder = re.compile("\(edge\((v\d*), (v\d*)\), curve (\d*)\)")
-
-                c = BasicFamily("")
-                c.monoid = Monoid()
-
-                vertices = {}
-                for m in vertexInfoFinder.finditer(vertexInfo):
-                    if m:
-                        vName = m.group(1)
-                        vGenus = m.group(2)
-                        v = Vertex(vName, int(vGenus))
-                        vertices[vName] = v
-
-                edges = set()
-                for m in edgeInfoFinder.finditer(edgeInfo):
-                    if m:
-                        eName = m.group(0)
-                        eVert1Name = m.group(1)
-                        eVert2Name = m.group(2)
-
-                        c.monoid.addgen(eName)
-                        eLength = c.monoid.Element({eName: 1})
-
-                        e = Edge(eName, eLength, vertices[eVert1Name], vertices[eVert2Name])
-                        edges.add(e)
-
-                legs = set()
-                for m in legInfoFinder.finditer(legInfo):
-                    if m:
-                        lName = m.group(0)
-                        lRootName = m.group(1)
-                        legs.add(Leg(lName, vertices[lRootName]))
-
-                c.addEdges(edges)
-                c.addLegs(legs)
-                for vName in vertices:
-                    c.addVertex(vertices[vName])
-
-                self.curves.add(c)
-
-                if c.numEdges in self.curvesDict:
-                    self.curvesDict[c.numEdges].append(c)
-                else:
-                    self.curvesDict[c.numEdges] = [c]
-
-                m = curveIdInfoFinder.match(curveIdInfo)
-                if m:
-                    curveId = m.group(1)
-                    curveIdDictionary[curveId] = c
-
-                edgeContractions = []
-                for m in contractionInfoFinder.finditer(contractionInfo):
-                    if m:
-                        vert1 = vertices[m.group(1)]
-                        vert2 = vertices[m.group(2)]
-                        contractionID = m.group(3)
-                        edgeContractions.append(({vert1, vert2}, contractionID))
-                curveContractionDictionary[c] = edgeContractions
-            for c in self.curves:
-                self.contractionDict[c] = []
-                edgeContractions = curveContractionDictionary[c]
-                for e in c.edges:
-                    contEntry = [entry for entry in edgeContractions if entry[0] == e.vertices].pop()
-                    self.contractionDict[c].append((e, curveIdDictionary[contEntry[1]]))
+
+        curveStrings = content.split("\n" + curveEntryDelimiter + "\n")
+
+        # Maps the curve IDs of the file to stratum IDs
+        curveIdDictionary = {}
+
+        # For each stratum, the list of pairs (k, file ID of the contraction of edge k)
+        fileContractions = {}
+
+        for curveString in curveStrings:
+            vertexInfo, edgeInfo, legInfo, curveIdInfo, contractionInfo = curveString.split("\n")[:5]
+
+            # Parse the curve straight into a compact curve
+            vertices = {}
+            genera = []
+            for m in vertexInfoFinder.finditer(vertexInfo):
+                vertices[m.group(1)] = len(genera)
+                genera.append(int(m.group(2)))
+
+            edges = [(vertices[m.group(1)], vertices[m.group(2)]) for m in edgeInfoFinder.finditer(edgeInfo)]
+            legRoots = [vertices[m.group(1)] for m in legInfoFinder.finditer(legInfo)]
+
+            c = CompactCurve(genera, (a for (a, _) in edges), (b for (_, b) in edges), legRoots)
+            stratum, _, edgeMap = c.canonicalize()
+            self.addCurve(stratum)
+            stratumId = self.getStratumId(stratum)
+
+            m = curveIdInfoFinder.match(curveIdInfo)
+            if m:
+                curveIdDictionary[m.group(1)] = stratumId
+
+            # Contractions are listed by the endpoints of the contracted edge. Parallel edges have isomorphic
+            # contractions, so it does not matter which of them an entry refers to.
+            contractionsByEndpoints = {}
+            for m in contractionInfoFinder.finditer(contractionInfo):
+                endpoints = frozenset((vertices[m.group(1)], vertices[m.group(2)]))
+                contractionsByEndpoints[endpoints] = m.group(3)
+
+            if len(edges) == 0 or contractionsByEndpoints:
+                fileContractions[stratumId] = sorted(
+                    (edgeMap[k], contractionsByEndpoints[frozenset(e)]) for k, e in enumerate(edges))
+
+        for i in fileContractions:
+            self._contractions[i] = [(k, curveIdDictionary[fileId]) for (k, fileId) in fileContractions[i]]
+        self._invalidateContractionCaches()
 
     def print_curves(self):
         i = 1
@@ -496,33 +971,101 @@ class TropicalModuliSpace(object):
             print()
             i += 1
 
-    def saveModuliSpaceToFile(self, filename="", curveEntryDelimiter="=", encoding='utf-8'):
+    # Saves the space as text. Curves are written one at a time, in order of their number of edges.
+    # The file is compressed if compression is "gzip", "bz2", or "lzma", or if compression is None and the filename ends
+    # in ".gz", ".bz2", ".xz", or ".lzma".
+    def saveModuliSpaceToFile(self, filename="", curveEntryDelimiter="=", encoding='utf-8', compression=None):
         if filename == "":
             filename = "SavedModuliSpaces/M-" + str(self._g) + "-" + str(self._n) + ".txt"
 
-        with open(filename, mode='w', encoding=encoding) as f:
-            curveStrings = []
-            curveList = sorted(self.curves, key=lambda x: x.numEdges)
-            for c in curveList:
-                c.simplifyNames()
-                vertexNames = [("(" + v.name + " with genus " + str(v.genus) + ")") for v in c.vertices]
-                edgeNames = [e.name for e in c.edges]
-                legNames = [nextLeg.name for nextLeg in c.legs]
-                vertexLine = "Vertices: {" + ",".join(vertexNames) + "}"
-                edgeLine = "Edges: {" + ",".join(edgeNames) + "}"
-                legLine = "Legs: {" + ",".join(legNames) + "}"
-                idLine = "Curve ID Number: " + str(curveList.index(c))
-                contractionLine = "Contraction info: "
-                contractionStrings = []
-                for info in self.contractionDict[c]:
-                    contractionStrings.append("(" + info[1].name + ", curve " + str(curveList.index(info[0])) + ")")
-                contractionLine += ", ".join(contractionStrings)
-                curveStrings.append("\n".join([vertexLine, edgeLine, legLine, idLine, contractionLine]))
-            if curveStrings:
-                curveStrings.reverse()
-                currentCurve = curveStrings.pop()
-                f.write(currentCurve)
-                while curveStrings:
-                    currentCurve = curveStrings.pop()
+        # Contraction info is part of the file format
+        if any(contractions is None for contractions in self._contractions):
+            self.generateContractionDictionary()
+
+        # Curves are written in order of their number of edges, and their IDs in the file are their positions
+        order = sorted(range(len(self._strata)), key=lambda i: self._strata[i].numEdges)
+        fileIds = {i: position for position, i in enumerate(order)}
+
+        with _openSavedSpace(filename, 'w', encoding, compression) as f:
+            for position, i in enumerate(order):
+                if position > 0:
                     f.write("\n" + curveEntryDelimiter + "\n")
-                    f.write(currentCurve)
+                contractions = [(k, fileIds[j]) for (k, j) in self._contractions[i]]
+                f.write(_formatCurveEntry(self._strata[i], position, contractions))
+
+    # Generates the space one layer at a time, as in generateLayersBFS, and saves each curve as soon as it is found,
+    # in the format of saveModuliSpaceToFile. The strata are not added to the space. Only the current layer and the
+    # previous one are held in memory, since the contractions of a curve lie in the previous layer.
+    # Returns the number of curves saved.
+    def generateAndSaveModuliSpaceToFile(self, filename="", curveEntryDelimiter="=", encoding='utf-8',
+                                         compression=None, processes=None):
+        if filename == "":
+            filename = "SavedModuliSpaces/M-" + str(self._g) + "-" + str(self._n) + ".txt"
+
+        numCurves = 0
+        with _openSavedSpace(filename, 'w', encoding, compression) as f:
+            previousLayerIds = {}
+            for layer in self.generateLayersBFS(processes):
+                # Compact curves hash by isomorphism class, so contractions can be looked up directly
+                layerIds = {}
+                for c in layer:
+                    contractions = [(k, previousLayerIds[c.getContraction(k)]) for k in range(c.numEdges)]
+                    if numCurves > 0:
+                        f.write("\n" + curveEntryDelimiter + "\n")
+                    f.write(_formatCurveEntry(c, numCurves, contractions))
+                    layerIds[c] = numCurves
+                    numCurves += 1
+                previousLayerIds = layerIds
+
+        return numCurves
+
+    def saveModuliSpaceToBinaryFile(self, filename=""):
+        """
+        Saves the space in the binary format of :class:`~Tropical2020.general_families.ModuliSpaceFile.ModuliSpaceFile`,
+        along with its contraction information. The IDs of the curves in the file are their stratum IDs.
+
+        Parameters
+        ----------
+        filename : str, optional
+            the file to write. Defaults to ``SavedModuliSpaces/M-g-n.tms``.
+        """
+
+        if filename == "":
+            filename = "SavedModuliSpaces/M-" + str(self._g) + "-" + str(self._n) + ".tms"
+
+        if any(contractions is None for contractions in self._contractions):
+            self.generateContractionDictionary()
+
+        ModuliSpaceFile.write(filename, self._g, self._n, self._strata, self._contractions)
+
+    def loadModuliSpaceFromBinaryFile(self, filename):
+        """
+        Replaces the strata of the space by those saved by :func:`~saveModuliSpaceToBinaryFile`. The genus and number
+        of legs of the space are taken from the file.
+        """
+
+        savedSpace = ModuliSpaceFile.read(filename)
+        self._g, self._n = savedSpace.g, savedSpace.n
+
+        self._clearStrata()
+        for i in range(len(savedSpace)):
+            c, contractions = savedSpace.getRecord(i)
+            self.addCurve(c)
+            self._contractions[i] = contractions
+
+    @staticmethod
+    def convertTextFileToBinary(textFilename, binaryFilename, curveEntryDelimiter="=", encoding='utf-8',
+                                compression=None):
+        """
+        Converts a space saved by :func:`~saveModuliSpaceToFile` to the binary format of
+        :func:`~saveModuliSpaceToBinaryFile`.
+        """
+
+        m = TropicalModuliSpace(0, 0)
+        m.loadModuliSpaceFromFile(textFilename, curveEntryDelimiter, encoding, compression)
+
+        # The text format does not record the genus and number of legs of the space
+        if m.strata:
+            m._g, m._n = m.strata[0].genus, m.strata[0].numLegs
+
+        m.saveModuliSpaceToBinaryFile(binaryFilename)
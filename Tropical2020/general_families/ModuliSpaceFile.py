@@ -0,0 +1,182 @@
+import struct
+
+from ..basic_families.CompactCurve import CompactCurve
+
+
+class ModuliSpaceFile(object):
+    """
+    Reads a moduli space saved in the binary format written by :func:`~write`.
+
+    The file starts with a fixed size header, followed by one record per curve, and ends with a table of the offsets of
+    the records. A record holds the numbers of vertices, edges and legs of a curve, the genus of each vertex, the
+    endpoints of each edge, the root of each leg, and, if the file has contraction information, the ID of the
+    contraction of each edge. All integers are little-endian. The ID of a curve is the position of its record.
+
+    Curves are decoded one at a time, so any single curve can be read without reading the others. The buffer can be a
+    ``bytes`` object or a memory map of the file.
+
+    Attributes
+    ----------
+    g : int
+        the genus of the moduli space
+    n : int
+        the number of legs of the curves of the moduli space
+    numCurves : int
+        the number of curves in the file
+    hasContractions : bool
+        whether the file records the contraction of each edge of each curve
+    """
+
+    MAGIC = b"TMSB"
+    VERSION = 1
+
+    # Flags of the header
+    HAS_CONTRACTIONS = 1
+
+    # Magic, version, flags, g, n, number of curves, and offset of the offset table
+    _header = struct.Struct("<4sHHIIIQ")
+
+    # Numbers of vertices, edges and legs of a curve
+    _recordHeader = struct.Struct("<HHH")
+
+    # Structs of the rest of the records, by shape. See _getRecordStruct.
+    _recordStructs = {}
+
+    def __init__(self, buffer):
+        """
+        Parameters
+        ----------
+        buffer : bytes-like
+            the contents of a file written by :func:`~write`
+        """
+
+        self._buffer = buffer
+
+        magic, version, flags, self.g, self.n, self.numCurves, self._tableOffset = \
+            self._header.unpack_from(buffer, 0)
+        if magic != self.MAGIC:
+            raise ValueError("Not a saved moduli space.")
+        if version != self.VERSION:
+            raise ValueError("Unsupported version " + str(version) + " of the saved moduli space format.")
+
+        self.hasContractions = bool(flags & self.HAS_CONTRACTIONS)
+
+    @staticmethod
+    def read(filename):
+        """
+        Reads the whole file at filename into memory, and returns a :class:`ModuliSpaceFile` over it.
+        """
+
+        with open(filename, mode='rb') as f:
+            return ModuliSpaceFile(f.read())
+
+    def __len__(self):
+        return self.numCurves
+
+    def _getOffset(self, i: int):
+        if not 0 <= i < self.numCurves:
+            raise IndexError("There is no curve with ID " + str(i) + ".")
+        return struct.unpack_from("<Q", self._buffer, self._tableOffset + 8 * i)[0]
+
+    # Returns the number of edges of curve i, without decoding the curve
+    def getNumEdges(self, i: int):
+        return self._recordHeader.unpack_from(self._buffer, self._getOffset(i))[1]
+
+    # Returns the struct of the data of records with the given shape, creating it on first use
+    @staticmethod
+    def _getRecordStruct(numVertices: int, numEdges: int, numLegs: int, numTargets: int):
+        shape = (numVertices, numEdges, numLegs, numTargets)
+        recordStruct = ModuliSpaceFile._recordStructs.get(shape)
+        if recordStruct is None:
+            recordStruct = struct.Struct("<" + str(numVertices) + "B" + str(2 * numEdges + numLegs) + "H" +
+                                         str(numTargets) + "I")
+            ModuliSpaceFile._recordStructs[shape] = recordStruct
+        return recordStruct
+
+    def getRecord(self, i: int):
+        """
+        Decodes curve i.
+
+        Returns
+        -------
+        tuple
+            ``(curve, contractions)``, where ``curve`` is a canonical compact curve, and ``contractions`` is the list of
+            pairs ``(k, j)`` such that contracting edge ``k`` of the curve yields curve ``j``, or None if the file
+            has no contraction information
+        """
+
+        offset = self._getOffset(i)
+        numVertices, numEdges, numLegs = self._recordHeader.unpack_from(self._buffer, offset)
+        numTargets = numEdges if self.hasContractions else 0
+        data = self._getRecordStruct(numVertices, numEdges, numLegs, numTargets).unpack_from(
+            self._buffer, offset + self._recordHeader.size)
+
+        legStart = numVertices + 2 * numEdges
+        targetStart = legStart + numLegs
+        curve = CompactCurve(data[:numVertices], data[numVertices:numVertices + numEdges],
+                             data[numVertices + numEdges:legStart], data[legStart:targetStart], isCanonical=True)
+        contractions = list(enumerate(data[targetStart:])) if self.hasContractions else None
+        return curve, contractions
+
+    # Returns curve i as a canonical compact curve
+    def getCurve(self, i: int):
+        return self.getRecord(i)[0]
+
+    # Returns the list of pairs (k, j) such that contracting edge k of curve i yields curve j, or None if the file has
+    # no contraction information
+    def getContractions(self, i: int):
+        return self.getRecord(i)[1]
+
+    def __iter__(self):
+        for i in range(self.numCurves):
+            yield self.getCurve(i)
+
+    @staticmethod
+    def write(filename, g: int, n: int, curves, contractions=None):
+        """
+        Writes curves to filename in the binary format. The curves are written as they are produced.
+
+        Parameters
+        ----------
+        filename : str
+            the file to write
+        g : int
+            the genus of the moduli space
+        n : int
+            the number of legs of the curves of the moduli space
+        curves : iterable
+            the canonical compact curves of the space. The ID of each curve is its position.
+        contractions : iterable, optional
+            for each curve, the list of pairs ``(k, j)`` such that contracting edge ``k`` of the curve yields curve
+            ``j``, with each edge appearing once
+        """
+
+        flags = ModuliSpaceFile.HAS_CONTRACTIONS if contractions is not None else 0
+        contractions = iter(contractions) if contractions is not None else None
+        recordHeader = ModuliSpaceFile._recordHeader
+
+        with open(filename, mode='wb') as f:
+            # The header is written again once the number of curves and the offset of the table are known
+            f.write(ModuliSpaceFile._header.pack(ModuliSpaceFile.MAGIC, ModuliSpaceFile.VERSION, flags, g, n, 0, 0))
+
+            offsets = []
+            offset = ModuliSpaceFile._header.size
+            for c in curves:
+                targets = []
+                if contractions is not None:
+                    targets = [j for (_, j) in sorted(next(contractions))]
+                    assert len(targets) == c.numEdges, "Every edge needs exactly one contraction."
+
+                recordStruct = ModuliSpaceFile._getRecordStruct(c.numVertices, c.numEdges, c.numLegs, len(targets))
+                record = recordHeader.pack(c.numVertices, c.numEdges, c.numLegs) + recordStruct.pack(
+                    *c.genera, *c.edgeVert1, *c.edgeVert2, *c.legRoots, *targets)
+
+                f.write(record)
+                offsets.append(offset)
+                offset += len(record)
+
+            f.write(struct.pack("<" + str(len(offsets)) + "Q", *offsets))
+
+            f.seek(0)
+            f.write(ModuliSpaceFile._header.pack(ModuliSpaceFile.MAGIC, ModuliSpaceFile.VERSION, flags, g, n,
+                                                 len(offsets), offset))
@@ -1,2 +1,6 @@
+from .CellularChainComplex import *
 from .Family import *
+from .IsotypeIndex import *
 from .ModuliSpace import *
+from .ModuliSpaceFile import *
+from .MappedModuliSpace import *
@@ -1,11 +1,18 @@
 import sys
 from .ModuliSpace import *
 
-if len(sys.argv) != 3:
-    print("Usage: python3 generateAndSaveModuliSpace.py g n")
+if len(sys.argv) not in (3, 4):
+    print("Usage: python3 generateAndSaveModuliSpace.py g n [checkpointFile]")
 else:
     g = int(sys.argv[1])
     n = int(sys.argv[2])
+
+    # Progress is checkpointed, so that an interrupted run picks up where it left off when started again
+    if len(sys.argv) == 4:
+        checkpointFile = sys.argv[3]
+    else:
+        checkpointFile = "SavedModuliSpaces/M-" + str(g) + "-" + str(n) + ".checkpoint"
+
     m = TropicalModuliSpace(g, n)
-    m.generateSpaceDFS()
+    m.generateSpaceDFS(checkpointFile=checkpointFile, recordContractions=True)
     m.saveModuliSpaceToFile()
@@ -40,6 +40,21 @@ class CurveTests:
     def verifyIsomorphism(curve1, curve2, isIsomorphic=True):
         assert curve1.isIsomorphicTo(curve2) == isIsomorphic
 
+    @staticmethod
+    def verifyIncidenceIndex(curve):
+        # Compare the incrementally maintained degrees, characteristics, and genus against direct scans
+        counts = {}
+        for v in curve.vertices:
+            edgeDegree = sum(1 for e in curve.edges if e.vert1 == v) + sum(1 for e in curve.edges if e.vert2 == v)
+            legDegree = sum(1 for l in curve.legs if l.root == v)
+            loops = sum(1 for e in curve.edges if e.vertices == {v})
+            assert curve.edgeDegree(v) == edgeDegree
+            assert curve.legDegree(v) == legDegree
+            key = (edgeDegree, legDegree, v.genus, loops)
+            counts[key] = counts.get(key, 0) + 1
+        assert curve.vertexCharacteristicCounts == counts
+        assert curve.genus == len(curve.edges) - len(curve.vertices) + 1 + sum(v.genus for v in curve.vertices)
+
 
 class TreeTests:
     @staticmethod
@@ -174,3 +189,38 @@ def test_isos():
     C.addLeg(s2)
 
     CurveTests.verifyIsomorphism(C, D)
+
+
+def test_incidence_index():
+    C = BasicFamily("Incidence")
+    v1 = Vertex("v1", 0)
+    v2 = Vertex("v2", 1)
+    v3 = Vertex("v3", 0)
+    e1 = Edge("e1", freeElementA, v1, v2)
+    e2 = Edge("e2", freeElementB, v2, v3)
+    e3 = Edge("e3", freeElementC, v3, v3)
+    e4 = Edge("e4", freeElementD, v1, v3)
+    l1 = Leg("l1", v1)
+    l2 = Leg("l2", v3)
+
+    C.addEdges({e1, e2, e3, e4})
+    C.addLegs({l1, l2})
+    CurveTests.verifyIncidenceIndex(C)
+
+    # Moving endpoints keeps the index current
+    C.moveEndpoint(e1, 2, v3)
+    C.moveEndpoint(l1, 1, v2)
+    CurveTests.verifyIncidenceIndex(C)
+    CurveTests.verifyAndTestEndpointsOfEdges(C, v2, {(e2, 1), (l1, 1)})
+
+    # Copies and contractions have their own consistent indices
+    D, copyInfo = C.getFullyShallowCopy(True)
+    CurveTests.verifyIncidenceIndex(D)
+    D.contract(copyInfo[e2])
+    CurveTests.verifyIncidenceIndex(D)
+    CurveTests.verifyIncidenceIndex(C)
+    CurveTests.verifyGenus(D, C.genus)
+
+    C.removeVertex(v3)
+    CurveTests.verifyIncidenceIndex(C)
+    CurveTests.verifyStructure(C, {v1, v2}, set(), {l1})
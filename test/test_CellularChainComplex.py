@@ -0,0 +1,37 @@
+from Tropical2020.general_families.ModuliSpace import *
+from Tropical2020.general_families.CellularChainComplex import *
+
+
+class CellularChainComplexTests:
+    @staticmethod
+    def verifyBoundaryOfBoundary(complex_):
+        # The boundary of a boundary vanishes
+        for p in range(1, complex_.dimension + 1):
+            product = complex_.getBoundaryMatrix(p - 1).toDense() @ complex_.getBoundaryMatrix(p).toDense()
+            assert not product.any()
+
+
+def getComplex(g, n):
+    m = TropicalModuliSpace(g, n)
+    m.generateSpaceDFS(recordContractions=True)
+    return CellularChainComplex(m)
+
+
+def test_cells():
+    # In genus 2, the curves with a double edge or two loops at a vertex are zero. This leaves two cells of dimension
+    # 0, the genus 1 vertex with a loop and the two genus 1 vertices joined by an edge, and one cell of dimension 1
+    # joining them, where a genus 1 vertex is joined to a genus 0 vertex with a loop
+    complex_ = getComplex(2, 0)
+    assert [len(cells) for cells in complex_.cells] == [2, 1]
+    assert complex_.getBoundaryMatrix(1).toDense().tolist() in ([[1], [-1]], [[-1], [1]])
+    CellularChainComplexTests.verifyBoundaryOfBoundary(complex_)
+
+
+def test_homology():
+    # The link of M_2 is rationally acyclic, and the link of M_3 has the homology of a 5-sphere, coming from the
+    # complete graph on four vertices
+    assert getComplex(2, 0).getBettiNumbers(reduced=True) == [0, 0]
+    complex_ = getComplex(3, 0)
+    CellularChainComplexTests.verifyBoundaryOfBoundary(complex_)
+    assert complex_.getBettiNumbers(reduced=True) == [0, 0, 0, 0, 0, 1]
+    assert complex_.getBettiNumbers() == [1, 0, 0, 0, 0, 1]
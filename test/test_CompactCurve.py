@@ -0,0 +1,128 @@
+import pickle
+
+from Tropical2020.basic_families.CompactCurve import *
+
+
+class CompactCurveTests:
+    @staticmethod
+    def verifyRoundTrip(curve):
+        compactCurve = CompactCurve.fromBasicFamily(curve)
+        assert compactCurve.toBasicFamily().isIsomorphicTo(curve)
+        assert compactCurve.isIsomorphicTo(curve)
+        assert compactCurve.genus == curve.genus
+
+    @staticmethod
+    def verifyContractions(curve):
+        # Contracting an edge of the compact curve agrees with contracting the matching edge of the basic family
+        compactCurve, _, edges = CompactCurve.fromBasicFamily(curve, returnOrders=True)
+        for i, e in enumerate(edges):
+            assert compactCurve.getContraction(i).isIsomorphicTo(curve.getContraction(e))
+
+
+def getTestCurve():
+    # A genus 1 vertex with a leg, joined by a double edge to a vertex with a loop and two legs
+    C = BasicFamily("C")
+    v = Vertex("v", 1)
+    w = Vertex("w", 0)
+    C.addEdges({Edge("e1", None, v, w), Edge("e2", None, w, v), Edge("e3", None, w, w)})
+    C.addLegs({Leg("l1", v), Leg("l2", w), Leg("l3", w)})
+    return C
+
+
+def test_conversion_and_contraction():
+    C = getTestCurve()
+    CompactCurveTests.verifyRoundTrip(C)
+    CompactCurveTests.verifyContractions(C)
+
+
+def test_canonical_form():
+    a = CompactCurve((1, 0), (0, 0, 1), (1, 1, 1), (0, 1, 1))
+    b = CompactCurve((0, 1), (1, 0, 0), (0, 1, 0), (0, 0, 1))
+
+    # Isomorphic curves have the same canonical data, and so compare and hash equal
+    assert a.canonical().genera == b.canonical().genera
+    assert a.canonical().edgeVert1 == b.canonical().edgeVert1
+    assert a == b and hash(a) == hash(b)
+    assert a != CompactCurve((1, 0), (0, 0, 0), (1, 1, 0), (0, 1, 1))
+
+    # Compact curves are immutable and picklable
+    try:
+        a.genera = (2,)
+        assert False
+    except AttributeError:
+        pass
+    assert pickle.loads(pickle.dumps(a)) == a
+
+    # Canonical curves are encoded as bytes without loss
+    encoded = a.canonical().toBytes()
+    assert CompactCurve.fromBytes(encoded).genera == a.canonical().genera
+    assert CompactCurve.fromBytes(encoded, isCanonical=True).toBytes() == encoded == b.canonical().toBytes()
+
+
+def test_specializations():
+    # The seed of M_{1, 1} only specializes to the loop with a leg
+    seed = CompactCurve.seed(1, 1)
+    assert set(seed.getSpecializations()) == {CompactCurve((0,), (0,), (0,), (0,))}
+    assert all(c.genus == 2 and c.numEdges == 1 for c in CompactCurve.seed(2, 2).getSpecializations())
+
+
+def test_augmentations():
+    # A genus 2 vertex with two legs has two splitting orbits and one genus reduction
+    seed = CompactCurve.seed(2, 2)
+    augmentations = list(seed.getAugmentations())
+    assert set(augmentations) == set(seed.getSpecializations())
+    assert all(c.isCanonicalAugmentation() for c in augmentations)
+
+    # Moving each edge of a curve to the end, the curves that pass are those whose last edge is in the orbit of the
+    # canonical parent edge
+    def withEdgeLast(curve, i):
+        order = [j for j in range(curve.numEdges) if j != i] + [i]
+        return CompactCurve(curve.genera, (curve.edgeVert1[j] for j in order), (curve.edgeVert2[j] for j in order),
+                            curve.legRoots)
+
+    # All edges of a triangle with a leg at each corner are equivalent
+    triangle = CompactCurve((0, 0, 0), (0, 1, 0), (1, 2, 2), (0, 1, 2))
+    assert all(withEdgeLast(triangle, i).isCanonicalAugmentation() for i in range(3))
+
+    # A chain with different ends has one canonical parent edge
+    chain = CompactCurve((0, 0, 1), (0, 1), (1, 2), (0, 0, 1, 2))
+    assert sum(withEdgeLast(chain, i).isCanonicalAugmentation() for i in range(2)) == 1
+
+
+def test_edge_orbits():
+    # Two vertices joined by two edges, each with a loop and a leg
+    curve = CompactCurve((0, 0), (0, 0, 1, 0), (1, 0, 1, 1), (0, 1))
+    assert curve.getEdgeOrbits() == [0, 1, 2, 0]
+
+    # Once the automorphisms are known, the two loops are in the same orbit
+    assert curve.canonicalForm.generators
+    assert curve.getEdgeOrbits() == [0, 1, 1, 0]
+
+
+def test_automorphism_group():
+    # The test curve has no vertex symmetries, but its double edge can be swapped, its loop flipped, and the two legs
+    # at w swapped
+    C = getTestCurve()
+    assert C.automorphismGroup().order == 8
+    assert CompactCurve.fromBasicFamily(C).automorphismGroup().order == 8
+
+    # An edge joining two vertices with two legs each, in M_{0, 4}: swapping the vertices and the legs at each vertex
+    assert CompactCurve((0, 0), (0,), (1,), (0, 0, 1, 1)).automorphismGroup().order == 2 * 2 * 2
+
+    # A triangle of genus 0 vertices with two legs at each corner has the symmetries of the triangle, and each pair
+    # of legs can be swapped
+    triangle = CompactCurve((0, 0, 0), (0, 1, 0), (1, 2, 2), (0, 0, 1, 1, 2, 2))
+    group = triangle.automorphismGroup()
+    assert group.vertexOrder == 6 and group.order == 6 * 2 ** 3
+    assert group is triangle.automorphismGroup()
+
+    # Every generator preserves incidence
+    for vertexMap, halfEdgeMap in group.generators:
+        for (i, n), (j, m) in halfEdgeMap.items():
+            ends = (triangle.edgeVert1, triangle.edgeVert2)
+            assert vertexMap[ends[n - 1][i]] == ends[m - 1][j]
+
+    # Two vertices of genus 1 joined by three edges, each with a loop: swapping the vertices, permuting the three
+    # edges, and flipping or keeping each loop
+    curve = CompactCurve((1, 1), (0, 0, 0, 0, 1), (1, 1, 1, 0, 1))
+    assert curve.automorphismGroup().order == 2 * 6 * 2 * 2
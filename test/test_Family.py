@@ -0,0 +1,34 @@
+from Tropical2020.general_families.Family import *
+from Tropical2020.general_families.ModuliSpace import *
+
+
+def test_from_maximal_strata():
+    # The contraction closure of the maximal strata of M_{2, 2} is the whole space, with one morphism per edge
+    m = TropicalModuliSpace(2, 2)
+    m.generateSpaceDFS()
+    family = Family.fromMaximalStrata(m.generateMaximalStrata())
+    assert len(family.basicFamilies) == len(m.strata)
+    assert len(family.morphisms) == sum(stratum.numEdges for stratum in m.strata)
+    assert {CompactCurve.fromBasicFamily(curve) for curve in family.maximalCurvesIter()} == \
+        set(m.generateMaximalStrata())
+
+    # A single curve of M_{1, 3}, the triangle with a leg at each corner, generates the curves obtained by contracting
+    # one, two, or three of its edges
+    triangle = CompactCurve((0, 0, 0), (0, 1, 0), (1, 2, 2), (0, 1, 2))
+    family = Family.fromMaximalStrata([triangle.toBasicFamily()])
+    assert len(family.basicFamilies) == 4
+    assert all(morphism.domain.numEdges == morphism.codomain.numEdges + 1 for morphism in family.morphisms)
+
+
+def test_from_minimal_strata():
+    # The specialization closure of the seed of M_{1, 3} is the whole space
+    m = TropicalModuliSpace(1, 3)
+    m.generateSpaceDFS()
+    family = Family.fromMinimalStrata([CompactCurve.seed(1, 3)])
+    assert {CompactCurve.fromBasicFamily(curve) for curve in family.basicFamilies} == set(m.strata)
+    assert len(family.morphisms) == sum(stratum.numEdges for stratum in m.strata)
+
+    # Bounding the number of edges keeps the curves with at most that many edges, and the contractions between them
+    family = Family.fromMinimalStrata([CompactCurve.seed(1, 3)], maxEdges=1)
+    assert len(family.basicFamilies) == len([stratum for stratum in m.strata if stratum.numEdges <= 1])
+    assert all(morphism.domain.numEdges == 1 for morphism in family.morphisms)
@@ -0,0 +1,57 @@
+from Tropical2020.general_families.ModuliSpace import *
+
+
+class IsomorphismTests:
+    @staticmethod
+    def verifyAgreesWithBruteForce(curve1, curve2):
+        sameCertificate = curve1.canonicalCertificate == curve2.canonicalCertificate
+        assert curve1.isBruteForceIsomorphicTo(curve2) == sameCertificate
+        assert curve1.isIsomorphicTo(curve2) == sameCertificate
+
+    @staticmethod
+    def verifyCopyIsIsomorphic(curve):
+        assert curve.getFullyShallowCopy().canonicalCertificate == curve.canonicalCertificate
+
+
+def test_relabeled_cycle():
+    # Two 4-cycles with a leg and a genus 1 vertex at opposite corners, built with different vertex orders
+    C = BasicFamily("Cycle")
+    v = [Vertex("v" + str(i), 1 if i == 2 else 0) for i in range(4)]
+    C.addEdges({Edge("e" + str(i), None, v[i], v[(i + 1) % 4]) for i in range(4)})
+    C.addLeg(Leg("l", v[0]))
+
+    D = BasicFamily("Relabeled cycle")
+    w = [Vertex("w" + str(i), 1 if i == 3 else 0) for i in range(4)]
+    D.addEdges({Edge("f1", None, w[1], w[0]), Edge("f2", None, w[0], w[3]),
+                Edge("f3", None, w[3], w[2]), Edge("f4", None, w[2], w[1])})
+    D.addLeg(Leg("m", w[1]))
+
+    # Moving the genus to a vertex adjacent to the leg gives a different curve with the same characteristics
+    E = BasicFamily("Different cycle")
+    x = [Vertex("x" + str(i), 1 if i == 1 else 0) for i in range(4)]
+    E.addEdges({Edge("g" + str(i), None, x[i], x[(i + 1) % 4]) for i in range(4)})
+    E.addLeg(Leg("n", x[0]))
+
+    assert C.isIsomorphicTo(D)
+    assert not C.isIsomorphicTo(E)
+    IsomorphismTests.verifyAgreesWithBruteForce(C, D)
+    IsomorphismTests.verifyAgreesWithBruteForce(C, E)
+
+
+def test_strata_certificates():
+    m = TropicalModuliSpace(2, 3)
+    m.generateSpaceDFS()
+
+    # Distinct strata have distinct certificates
+    assert len({c.canonicalCertificate for c in m.curves}) == len(m.curves)
+
+    for curve in m.curves:
+        IsomorphismTests.verifyCopyIsIsomorphic(curve)
+
+    # Compare against the brute force search wherever the cheap invariants can't tell curves apart
+    for n in m.curvesDict:
+        curves = m.curvesDict[n]
+        for i in range(len(curves)):
+            for j in range(i + 1, len(curves)):
+                if curves[i].vertexCharacteristicCounts == curves[j].vertexCharacteristicCounts:
+                    IsomorphismTests.verifyAgreesWithBruteForce(curves[i], curves[j])
@@ -1,5 +1,7 @@
+import pickle
 
 from Tropical2020.general_families.ModuliSpace import *
+from Tropical2020.general_families.MappedModuliSpace import MappedModuliSpace
 
 
 class ModuliSpaceTests:
@@ -37,3 +39,304 @@ class ModuliSpaceTests:
 def test_sizes():
     # Generate some small, known, moduli spaces
     ModuliSpaceTests.verifyCommonSizes()
+
+
+def test_count_strata():
+    # Counting the strata agrees with generating them, and does not store them
+    m = TropicalModuliSpace(1, 5)
+    assert m.countStrata() == [len(layer) for layer in m.generateLayersBFS()]
+    assert sum(m.countStrata()) == 76
+    assert m.strata == []
+    assert m.countStrata(processes=2) == m.countStrata()
+
+
+def test_maximal_strata():
+    # The maximal strata are the strata with the most edges
+    m = TropicalModuliSpace(2, 3)
+    layers = list(m.generateLayersBFS())
+    assert set(m.generateMaximalStrata()) == set(layers[-1])
+
+    # There are 5 trivalent graphs of genus 3 and 17 of genus 4, and M_{1, 0} only has its seed
+    assert len(TropicalModuliSpace(3, 0).generateMaximalStrata()) == 5
+    assert len(TropicalModuliSpace(4, 0).generateMaximalStrata()) == 17
+    assert TropicalModuliSpace(1, 0).generateMaximalStrata() == [CompactCurve.seed(1, 0)]
+    assert TropicalModuliSpace(0, 2).generateMaximalStrata() == []
+
+
+def test_isotype_index():
+    # The cheaper, colliding invariant must give the same strata as the canonical certificate
+    m = TropicalModuliSpace(1, 5, isotypeKey=IsotypeIndex.invariantKey)
+    m.generateSpaceDFS()
+    assert len(m.curves) == 76
+
+    stats = m.isotypeIndexStatistics()
+    assert stats["curves"] == 76
+    assert sum(size * count for size, count in stats["bucketSizeCounts"].items()) == 76
+
+    # Every stratum is found in the index, and a copy of it is found up to isomorphism
+    for curve in m.curves:
+        assert m.containsUpToIsomorphism(curve.getFullyShallowCopy(), returnMatch=True) == (True, curve)
+
+
+def test_save_and_load(tmp_path):
+    m = TropicalModuliSpace(1, 4)
+    m.generateSpaceDFS()
+    filename = str(tmp_path / "M-1-4.txt")
+    m.saveModuliSpaceToFile(filename)
+
+    loaded = TropicalModuliSpace(1, 4)
+    loaded.loadModuliSpaceFromFile(filename)
+    assert set(loaded.strata) == set(m.strata)
+
+    # The loaded contraction info agrees with the contractions of the loaded curves
+    for curve, contractions in loaded.contractionDict.items():
+        assert len(contractions) == curve.numEdges
+        for e, target in contractions:
+            assert curve.getContraction(e).isIsomorphicTo(target)
+
+
+def test_bfs_generation():
+    dfs = TropicalModuliSpace(2, 2)
+    dfs.generateSpaceDFS()
+    dfs.generateContractionDictionary()
+
+    bfs = TropicalModuliSpace(2, 2)
+    bfs.generateSpaceBFS(generateContractions=True)
+    assert set(bfs.strata) == set(dfs.strata)
+
+    # Strata come out in order of their number of edges, one layer at a time
+    assert [c.numEdges for c in bfs.strata] == sorted(c.numEdges for c in bfs.strata)
+    assert [len(layer) for layer in bfs.generateLayersBFS()] == [len(dfs.curvesDict[k]) for k in sorted(dfs.curvesDict)]
+
+    # The contractions found during generation agree with those found afterwards
+    for i, stratum in enumerate(bfs.strata):
+        j = dfs.getStratumId(stratum)
+        assert [(k, dfs.strata[t]) for (k, t) in dfs._contractions[j]] == \
+               [(k, bfs.strata[t]) for (k, t) in bfs._contractions[i]]
+
+    empty = TropicalModuliSpace(0, 2)
+    empty.generateSpaceBFS()
+    assert empty.strata == []
+
+
+def test_parallel_generation():
+    serial = TropicalModuliSpace(1, 5)
+    serial.generateSpaceBFS()
+
+    parallel = TropicalModuliSpace(1, 5)
+    parallel.generateSpaceBFS(processes=2)
+    assert parallel.strata == serial.strata
+
+
+def test_canonical_augmentation():
+    for g, n in [(0, 7), (2, 3), (3, 1)]:
+        bfs = TropicalModuliSpace(g, n)
+        bfs.generateSpaceBFS()
+
+        # Each stratum is produced exactly once, with no lookups among the strata found so far
+        layers = list(TropicalModuliSpace(g, n).generateLayersByAugmentation())
+        strata = [c for layer in layers for c in layer]
+        assert len(strata) == len(bfs.strata)
+        assert set(strata) == set(bfs.strata)
+
+
+def test_checkpoint_and_resume(tmp_path):
+    complete = TropicalModuliSpace(2, 2)
+    complete.generateSpaceDFS()
+
+    # Interrupt a generation partway through by checkpointing its state
+    partial = TropicalModuliSpace(2, 2)
+    partial.addCurve(partial.getSeedCurve())
+    frontier = [partial.strata[0]]
+    while len(partial.strata) < 20:
+        curve = frontier.pop()
+        for c in curve.getSpecializations():
+            if partial.addCurve(c):
+                frontier.append(partial.strata[-1])
+    checkpointFile = str(tmp_path / "M-2-2.checkpoint")
+    partial.saveCheckpoint(checkpointFile, frontier)
+
+    # Resuming finds the rest of the space
+    resumed = TropicalModuliSpace(2, 2)
+    resumed.generateSpaceDFS(checkpointFile=checkpointFile)
+    assert set(resumed.strata) == set(complete.strata)
+    assert len(resumed.strata) == len(complete.strata)
+
+    # A finished checkpoint has an empty frontier
+    assert TropicalModuliSpace(2, 2).loadCheckpoint(checkpointFile) == []
+
+
+def test_automorphism_groups():
+    m = TropicalModuliSpace(3, 0)
+    m.generateSpaceDFS()
+    groups = m.getAutomorphismGroups()
+    assert len(groups) == 42
+
+    # The groups of the strata agree with the groups of their basic families
+    for i, group in enumerate(groups):
+        assert m.getCurve(i).automorphismGroup().order == group.order
+
+    # The complete graph on four vertices is a stratum, and its vertices can be permuted arbitrarily
+    assert max(group.vertexOrder for group in groups) == 24
+
+
+def test_euler_characteristic(tmp_path):
+    m = TropicalModuliSpace(2, 0)
+    m.generateSpaceDFS()
+    assert m.getFVector() == [1, 2, 2, 2]
+
+    # The theta graph has 12 automorphisms and the dumbbell graph has 8
+    assert m.getFVector(weighted=True)[3] == Fraction(1, 12) + Fraction(1, 8)
+    assert m.getOrbifoldEulerCharacteristic() == Fraction(5, 12)
+
+    # A mapped space gives the same results
+    filename = str(tmp_path / "M-2-0.tms")
+    m.saveModuliSpaceToBinaryFile(filename)
+    with MappedModuliSpace(filename) as mapped:
+        assert mapped.getFVector() == m.getFVector()
+        assert mapped.getOrbifoldEulerCharacteristic() == Fraction(5, 12)
+
+    # With legs, automorphisms also permute the legs at each vertex. For genus 0 the orbifold Euler characteristic is
+    # (-1)^(n - 3) (n - 2)! / n!, and for M_{1, 2} it is 1/2 - 3/4 + 1/2.
+    for g, n, chi in [(0, 4, Fraction(-1, 12)), (0, 5, Fraction(1, 20)), (0, 6, Fraction(-1, 30)),
+                      (1, 2, Fraction(1, 4))]:
+        m = TropicalModuliSpace(g, n)
+        m.generateSpaceDFS()
+        assert m.getOrbifoldEulerCharacteristic() == chi
+
+        filename = str(tmp_path / ("M-" + str(g) + "-" + str(n) + ".tms"))
+        m.saveModuliSpaceToBinaryFile(filename)
+        with MappedModuliSpace(filename) as mapped:
+            assert mapped.getFVector(weighted=True) == m.getFVector(weighted=True)
+            assert mapped.getOrbifoldEulerCharacteristic() == chi
+
+            # Only the orders of the automorphism groups are kept
+            assert mapped.getAutomorphismGroupOrders() == [group.order for group in m.getAutomorphismGroups()]
+            assert mapped._automorphismGroups == []
+
+
+def test_recorded_contractions(tmp_path):
+    complete = TropicalModuliSpace(2, 2)
+    complete.generateSpaceDFS()
+    complete.generateContractionDictionary()
+
+    # Recording the contractions during the generation gives the same contraction information
+    recorded = TropicalModuliSpace(2, 2)
+    recorded.generateSpaceDFS(recordContractions=True)
+    assert recorded.strata == complete.strata
+    assert recorded._contractions == complete._contractions
+
+    # Without contraction information, getContractions finds the same contractions
+    generated = TropicalModuliSpace(2, 2)
+    generated.generateSpaceDFS()
+    assert all(generated.getContractions(i) == complete.getContractions(i) for i in range(len(complete.strata)))
+
+    # Contractions missed before a checkpoint are still found when resuming
+    checkpointFile = str(tmp_path / "M-2-2.checkpoint")
+    partial = TropicalModuliSpace(2, 2)
+    partial.addCurve(partial.getSeedCurve())
+    partial.saveCheckpoint(checkpointFile, [partial.strata[0]])
+    resumed = TropicalModuliSpace(2, 2)
+    resumed.generateSpaceDFS(checkpointFile=checkpointFile, recordContractions=True)
+    assert resumed._contractions == complete._contractions
+
+    # Checkpoints saved before contractions were recorded can be resumed too
+    with open(checkpointFile, mode='rb') as f:
+        checkpoint = pickle.load(f)
+    checkpoint["frontier"] = [0]
+    checkpoint["strata"] = checkpoint["strata"][:1]
+    del checkpoint["recordedContractions"]
+    with open(checkpointFile, mode='wb') as f:
+        pickle.dump(checkpoint, f)
+    resumed = TropicalModuliSpace(2, 2)
+    resumed.generateSpaceDFS(checkpointFile=checkpointFile, recordContractions=True)
+    assert resumed._contractions == complete._contractions
+
+
+def test_binary_file(tmp_path):
+    m = TropicalModuliSpace(1, 4)
+    m.generateSpaceDFS()
+    filename = str(tmp_path / "M-1-4.tms")
+    m.saveModuliSpaceToBinaryFile(filename)
+
+    loaded = TropicalModuliSpace(0, 0)
+    loaded.loadModuliSpaceFromBinaryFile(filename)
+    assert (loaded._g, loaded._n) == (1, 4)
+    assert loaded.strata == m.strata
+    assert loaded._contractions == m._contractions
+
+    # Single curves can be read by ID
+    savedSpace = ModuliSpaceFile.read(filename)
+    assert len(savedSpace) == len(m.strata)
+    assert savedSpace.getCurve(7) == m.strata[7]
+    assert savedSpace.getNumEdges(7) == m.strata[7].numEdges
+
+    # Converting a text file gives the same space
+    textFilename = str(tmp_path / "M-1-4.txt")
+    convertedFilename = str(tmp_path / "M-1-4-converted.tms")
+    m.saveModuliSpaceToFile(textFilename)
+    TropicalModuliSpace.convertTextFileToBinary(textFilename, convertedFilename)
+    converted = TropicalModuliSpace(1, 4)
+    converted.loadModuliSpaceFromBinaryFile(convertedFilename)
+    assert set(converted.strata) == set(m.strata)
+    for i, stratum in enumerate(converted.strata):
+        j = m.getStratumId(stratum)
+        assert [(k, converted.strata[t]) for (k, t) in converted._contractions[i]] == \
+               [(k, m.strata[t]) for (k, t) in m._contractions[j]]
+
+
+def test_mapped_space(tmp_path):
+    m = TropicalModuliSpace(1, 5)
+    m.generateSpaceBFS(generateContractions=True)
+    filename = str(tmp_path / "M-1-5.tms")
+    m.saveModuliSpaceToBinaryFile(filename)
+
+    with MappedModuliSpace(filename, cacheSize=8) as mapped:
+        assert len(mapped.curves) == 76
+        assert mapped.curves[-1].isIsomorphicTo(m.getCurve(75))
+        assert {k: len(curves) for k, curves in mapped.curvesDict.items()} == \
+               {k: len(curves) for k, curves in m.curvesDict.items()}
+
+        # Only a few decoded curves are kept
+        assert all(curve.numEdges == 5 for curve in mapped.curvesDict[5])
+        assert len(mapped._materializedCache) <= 8
+
+        # Contraction info is found for any curve isomorphic to a stratum
+        for i in (0, 20, 75):
+            curve = m.getCurve(i).getFullyShallowCopy()
+            contractions = mapped.contractionDict[curve]
+            assert len(contractions) == curve.numEdges
+            for e, target in contractions:
+                assert curve.getContraction(e).isIsomorphicTo(target)
+
+        assert mapped.containsUpToIsomorphism(m.getCurve(30))
+
+        # The view can be sent to other processes, and can't be modified
+        assert pickle.loads(pickle.dumps(mapped)).strata[10] == m.strata[10]
+        try:
+            mapped.addCurve(m.strata[0])
+            assert False
+        except TypeError:
+            pass
+
+
+def test_streaming_and_compressed_files(tmp_path):
+    m = TropicalModuliSpace(2, 2)
+    m.generateSpaceBFS()
+
+    # Saving a space generated layer by layer gives the same file as saving the curves as they are generated
+    savedFilename = str(tmp_path / "saved.txt")
+    streamedFilename = str(tmp_path / "streamed.txt")
+    m.saveModuliSpaceToFile(savedFilename)
+    assert TropicalModuliSpace(2, 2).generateAndSaveModuliSpaceToFile(streamedFilename) == 60
+    with open(savedFilename) as saved, open(streamedFilename) as streamed:
+        assert saved.read() == streamed.read()
+
+    # Compression is inferred from the extension, or given explicitly
+    for filename, compression in (("M-2-2.txt.gz", None), ("M-2-2.xz", None), ("M-2-2.txt", "bz2")):
+        filename = str(tmp_path / filename)
+        m.saveModuliSpaceToFile(filename, compression=compression)
+        loaded = TropicalModuliSpace(2, 2)
+        loaded.loadModuliSpaceFromFile(filename, compression=compression)
+        assert loaded.strata == m.strata
+        assert loaded._contractions == m._contractions
@@ -1,4 +1,6 @@
 from Tropical2020.basic_families.RPC import *
+import copy
+import pickle
 import pdb
 
 def test_RPC():
@@ -32,3 +34,142 @@ def test_RPC():
 
 
     w = y - x
+
+
+def test_elements():
+    # Elements of every monoid share one class, and pickle along with their monoid
+    M = Monoid()
+    M.addgen("x")
+    N = Monoid()
+    N.addgen("y")
+    x = M.Element({"x": 2})
+    assert type(x) is type(N.Element({"y": 1})) is MonoidElement
+
+    y = pickle.loads(pickle.dumps(x))
+    assert y.monoid.gens == ["x"]
+    assert y.monoid.eq(y, y.monoid.Element({"x": 2}))
+
+
+def test_dense_elements():
+    # Dense arithmetic and comparisons agree with those of the elements
+    M = Monoid()
+    for gen in "xyz":
+        M.addgen(gen)
+    x, y, z = (M.Element({gen: 1}) for gen in "xyz")
+    M.addrel(x + y - 2 * z)
+
+    elements = [x, y, z, x + y, 2 * z, M.Element({"x": 1}, 2)]
+    dense = M.todense(elements)
+    assert len(dense) == 6 and dense.denom == 2
+    assert dense[3].coeffs == {"x": 2, "y": 2} and dense[5].coeffs == {"x": 1} and dense[5].denom == 2
+
+    # Row 3 is x + y, which equals row 4, 2z
+    assert list(dense.combine([[0, 0, 0, 1, -1, 0], [1, 0, 0, 0, 0, 0]]).iszero()) == [True, False]
+    assert list(dense.scale([1, 1, 1, 1, 1, 2]).eq(M.todense([x, y, z, 2 * z, x + y, x]))) == [True] * 6
+    assert list((dense + dense).eq(2 * dense)) == [True] * 6
+
+    # Coefficients too large for int64 are kept as Python integers
+    big = M.todense([M.Element({"x": 2 ** 70})])
+    assert big.coeffs.dtype == object and not big.iszero()[0]
+    assert M.eq(big[0] - big[0], M.zero())
+
+
+def test_relations():
+    # The relations are kept in reduced row echelon form, so each pivot appears in one relation only
+    M = Monoid()
+    for gen in "wxyz":
+        M.addgen(gen)
+    w, x, y, z = (M.Element({gen: 1}) for gen in "wxyz")
+    M.addrel(x - 2 * z)
+    M.addrel(w + x + y)
+    M.addrel(2 * w + 2 * x + 2 * y)
+    assert set(M.rels) == {"w", "x"}
+    assert M.rels["w"].coeffs == {"w": 1, "y": 1, "z": 2} and M.rels["x"].coeffs == {"x": 1, "z": -2}
+
+    # Elements are compared through their projections, taking denominators into account
+    assert M.eq(x, 2 * z) and M.eq(-1 * w, y + x) and not M.eq(w, y)
+    assert M.eq(M.Element({"x": 1}, 2), z) and not M.eq(M.Element({"x": 1}, 2), x)
+    assert M.iszero(w + y + 2 * z) and not M.iszero(z)
+    assert list(M.todense([w + y + 2 * z, z, x - z, x - 2 * z]).iszero()) == [True, False, False, True]
+
+    # A copy shares the generators but not the relations, so its cached projection stays separate
+    N = copy.copy(M)
+    assert N.eq(x, 2 * z)
+    N.addrel(y - z)
+    assert N.eq(y, z) and not M.eq(y, z) and set(M.rels) == {"w", "x"}
+
+
+def test_dual():
+    # The facets of a cone in the plane spanned by (1, 0) and (1, 2), with an extra redundant generator
+    assert set(compute_facets(((1, 0), (1, 2), (1, 1)))) == {(0, 1), (2, -1)}
+
+    # In the monoid generated by x, y, z with x + y = 2z, the element x - z is not nonnegative, but z is
+    M = Monoid()
+    for gen in "xyz":
+        M.addgen(gen)
+    x, y, z = (M.Element({gen: 1}) for gen in "xyz")
+    M.addrel(x + y - 2 * z)
+    assert M.isgeqzero(z) and M.isgeqzero(2 * z - x) and not M.isgeqzero(x - z)
+    assert M.dual.shape == (2, 3)
+    assert list(M.todense([x, z - x, x - 2 * z]).isgeqzero()) == [True, False, False]
+
+    # Adding a generator or a relation updates the dual
+    M.addgen("w")
+    assert not M.isgeqzero(-1 * M.Element({"w": 1}))
+    M.addrel(M.Element({"w": 1}) + x)
+    assert M.isgeqzero(-1 * M.Element({"w": 1}))
+
+
+def test_normal_form():
+    M = Monoid()
+    for gen in "xyz":
+        M.addgen(gen)
+    x, y, z = (M.Element({gen: 1}) for gen in "xyz")
+    M.addrel(x + y - 2 * z)
+
+    # Equal elements have the same normal form and hash, so they can be deduplicated in sets and dictionaries
+    assert x.normalform() == (x + M.zero()).normalform() and hash(x + y) == hash(2 * z)
+    assert M.Element({"x": 2, "y": 2}, 4).normalform() == M.Element({"z": 1}).normalform()
+    assert len({x, y, z, x + y, 2 * z, 2 * z - y, M.Element({"z": 2}, 2)}) == 4
+    assert {x + y: "a"}[2 * z] == "a"
+
+    # The cached normal form follows changes to the element and to the relations
+    w = z.copy()
+    w += z
+    assert w == x + y and w.normalform() == (x + y).normalform()
+    M.addrel(x - y)
+    assert x.normalform() == z.normalform()
+
+    # Interning returns the first element of each value
+    lengths = [M.intern(e) for e in (x, 2 * z - x, z, y)]
+    assert all(e is x for e in lengths)
+
+    # Adding a relation changes hashes, so containers keyed by elements must be rebuilt
+    N = Monoid()
+    for gen in "xy":
+        N.addgen(gen)
+    x, y = N.Element({"x": 1}), N.Element({"y": 1})
+    keys = {x: "x"}
+    N.addrel(x - y)
+    assert hash(x) == hash(y) and y not in keys
+    assert {key: value for key, value in keys.items()}[y] == "x"
+
+
+def test_negative_denominators():
+    M = Monoid()
+    M.addgen("x")
+    x = M.Element({"x": 1})
+
+    # Zero with a negative denominator has the same normal form as zero
+    zero = M.Element({}, -1)
+    assert zero.normalform() == M.zero().normalform() == ((), 1)
+    assert M.eq(zero, M.zero()) and hash(zero) == hash(M.zero())
+    assert M.intern(M.zero()) is M.intern(zero)
+
+    # x / -1 is -x, and their difference is zero
+    a = M.Element({"x": 1}, -1)
+    b = -x
+    assert M.eq(a, b) and hash(a) == hash(b) and a.normalform() == (((0, -1),), 1)
+    assert M.eq(a - b, M.zero()) and hash(a - b) == hash(M.zero())
+    assert M.intern(b) is M.intern(a) and M.intern(x) is not M.intern(a)
+    assert M.eq(M.Element({"x": -2}, -4), M.Element({"x": 1}, 2))